@@ -1,23 +1,29 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
+import functools
 import logging
 import re
+import sys
 import typing
-from datetime import datetime
+import zlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
 from io import BytesIO
-from json import dumps
 from pathlib import Path
 from typing import Any, Literal
-from xml.etree.ElementTree import Element
 
 import hishel
 import httpx
+import orjson
 from dateutil import parser
 from lxml import etree
 
 if typing.TYPE_CHECKING:
-    from collections.abc import Generator, Iterator
-    from xml.etree.ElementTree import Element
+    from collections.abc import Coroutine, Generator, Iterable, Iterator
+
+    from lxml.etree import _Element as Element
 
 __all__: list[str] = ["JSONExporter", "SiteMapParser", "Sitemap", "SitemapIndex", "Url", "UrlSet"]
 
@@ -37,6 +43,48 @@ Fields = tuple[Literal["loc"], Literal["lastmod"], Literal["changefreq"], Litera
 UrlFields = tuple[Literal["loc"], Literal["lastmod"], Literal["changefreq"], Literal["priority"]]
 SitemapFields = tuple[Literal["loc"], Literal["lastmod"]]
 
+# Shared by every parse so the libxml2 parser context is set up once. Entity resolution and network
+# access are disabled, and blank text and comments are dropped since sitemaps never need them.
+_XML_PARSER = etree.XMLParser(
+    remove_blank_text=True,
+    remove_comments=True,
+    resolve_entities=False,
+    no_network=True,
+    collect_ids=False,
+)
+
+
+# Root tags of documents in the standard sitemap namespace, in Clark notation.
+_SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+_SITEMAPINDEX_TAG = f"{{{_SITEMAP_NS}}}sitemapindex"
+_URLSET_TAG = f"{{{_SITEMAP_NS}}}urlset"
+
+# Scheme check for <loc> values, compiled once since it runs for every Url and Sitemap.
+_URL_RE: re.Pattern[str] = re.compile(r"https?://", re.ASCII)
+
+
+def parse_iso8601(value: str) -> datetime:
+    """Parse an ISO-8601 datetime string.
+
+    The C implementation of `datetime.fromisoformat` handles the formats sitemaps use in practice
+    (YYYY-MM-DD and YYYY-MM-DDThh:mm:ss±hh:mm) many times faster than dateutil, so it is tried first.
+    A trailing "Z" or "z" after a time is rewritten to "+00:00" first, because `fromisoformat` only accepts "Z"
+    from Python 3.11. A date without a time is left alone, since `fromisoformat` would drop its offset.
+    Anything it rejects is handed to dateutil's `isoparse`.
+
+    Args:
+        value (str): An ISO-8601 formatted datetime string.
+
+    Returns:
+        datetime: The parsed datetime.
+    """
+    if value[-1:] in {"Z", "z"} and "T" in value:
+        value = value[:-1] + "+00:00"
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return parser.isoparse(value)
+
 
 class BaseData:
     """Base class for sitemap data.
@@ -45,6 +93,8 @@ class BaseData:
     such as location (`loc`) and last modified time (`lastmod`).
     """
 
+    __slots__ = ("_lastmod", "_loc")
+
     def __init__(self) -> None:
         self._lastmod: datetime | None = None
         self._loc: str | None = None
@@ -67,7 +117,7 @@ class BaseData:
         Args:
             value (str | None): An ISO-8601 formatted datetime string, or None.
         """
-        self._lastmod = parser.isoparse(value) if value is not None else None
+        self._lastmod = parse_iso8601(value) if value is not None else None
 
     @property
     def loc(self) -> str | None:
@@ -95,44 +145,248 @@ class BaseData:
             msg = "URL must be a string"
             raise TypeError(msg)
 
-        if not re.match(r"http[s]?://", value):
+        if not _URL_RE.match(value):
             msg: str = f"{value} is not a valid URL"
             raise ValueError(msg)
 
         self._loc = value
 
 
-def download_uri_data(uri: str, *, hishel_client: hishel.CacheClient | None = None, should_cache: bool = True) -> bytes:
+@functools.lru_cache(maxsize=1)
+def _http_client() -> httpx.Client:
+    """Get the client used by uncached downloads.
+
+    Created on first use and then shared, so consecutive requests to the same host reuse the TCP/TLS
+    connection. It is closed when the interpreter exits.
+
+    Returns:
+        httpx.Client: The shared client
+    """
+    client = httpx.Client(
+        timeout=10,
+        http2=True,
+        follow_redirects=True,
+        limits=httpx.Limits(max_keepalive_connections=16, keepalive_expiry=30),
+    )
+    atexit.register(client.close)
+    return client
+
+
+@functools.lru_cache(maxsize=1)
+def _default_cache_client() -> hishel.CacheClient:
+    """Get the cache client used by cached downloads when the caller does not pass one.
+
+    Created on first use and then shared, so the cache storage is opened once per process instead of once per
+    download. It uses the same settings as `SiteMapParser` with the default cache directory, and also caches
+    sitemaps served without Cache-Control headers based on their Last-Modified date, which is how most
+    sitemaps are served. It is closed when the interpreter exits.
+
+    Returns:
+        hishel.CacheClient: The shared cache client
+    """
+    client = hishel.CacheClient(
+        controller=SiteMapParser.get_hishel_controller(allow_heuristics=True),
+        storage=hishel.FileStorage(base_path=Path(".cache")),
+        timeout=10,
+        http2=True,
+        follow_redirects=True,
+        limits=httpx.Limits(max_keepalive_connections=16, keepalive_expiry=30),
+    )
+    atexit.register(client.close)
+    return client
+
+
+@typing.overload
+def download_uri_data(
+    uri: str,
+    *,
+    hishel_client: hishel.CacheClient | None = None,
+    should_cache: bool = True,
+    last_known_lastmod: None = None,
+) -> bytes: ...
+
+
+@typing.overload
+def download_uri_data(
+    uri: str,
+    *,
+    hishel_client: hishel.CacheClient | None = None,
+    should_cache: bool = True,
+    last_known_lastmod: datetime,
+) -> bytes | None: ...
+
+
+def download_uri_data(
+    uri: str,
+    *,
+    hishel_client: hishel.CacheClient | None = None,
+    should_cache: bool = True,
+    last_known_lastmod: datetime | None = None,
+) -> bytes | None:
     """Download the data from the uri.
 
     Args:
         uri(str): The uri to download. Expected format: HTTP/HTTPS URL.
         hishel_client(hishel.CacheClient): The Hishel client to use for downloading the data.
-            If None, the data will be downloaded without caching.
+            If None, a shared client caching to ".cache" is used. The client is left open.
         should_cache(bool): Whether to cache the request with Hishel (https://hishel.com/) or not.
+        last_known_lastmod(datetime | None): When the data was last known to change, e.g. the <lastmod> of
+            the sitemap in its sitemap index. Sent as If-Modified-Since so an unchanged sitemap is not
+            transferred again. Naive datetimes are treated as UTC.
+
+    Returns:
+        bytes | None: The data from the uri, or None if last_known_lastmod was given and the server answered
+            304 Not Modified
+
+    Raises:
+        httpx.DecodingError: If the data is a gzip file that is corrupt, truncated or larger than 50 MB uncompressed
+    """
+    client: hishel.CacheClient | httpx.Client = _http_client()
+    if should_cache:
+        client = hishel_client if hishel_client is not None else _default_cache_client()
+    headers: dict[str, str] = {}
+    if last_known_lastmod is not None:
+        if last_known_lastmod.tzinfo is None:
+            last_known_lastmod = last_known_lastmod.replace(tzinfo=timezone.utc)
+        headers["If-Modified-Since"] = format_datetime(last_known_lastmod.astimezone(timezone.utc), usegmt=True)
+
+    logger.info("Downloading from %s", uri)
+    r: httpx.Response = client.get(uri, headers=headers)
+
+    if last_known_lastmod is not None and r.status_code == httpx.codes.NOT_MODIFIED:
+        log_cache_usage(request=r)
+        logger.info("%s has not been modified", uri)
+        return None
+
+    return _response_content(uri=uri, response=r)
+
+
+async def download_uri_data_async(uri: str, *, client: httpx.AsyncClient) -> bytes:
+    """Download the data from the uri without blocking the event loop.
+
+    Args:
+        uri(str): The uri to download. Expected format: HTTP/HTTPS URL.
+        client(httpx.AsyncClient): The client to download with. Share one client between calls so
+            they reuse its connection pool. Pass a hishel.AsyncCacheClient to cache the response.
 
     Returns:
         bytes: The data from the uri
+
+    Raises:
+        httpx.DecodingError: If the data is a gzip file that is corrupt, truncated or larger than 50 MB uncompressed
     """
-    client: hishel.CacheClient | httpx.Client = (
-        hishel_client
-        if should_cache and hishel_client is not None
-        else httpx.Client(timeout=10, http2=True, follow_redirects=True)
-    )
-    with client:
-        logger.info("Downloading from %s", uri)
-        r: httpx.Response = client.get(uri)
+    logger.info("Downloading from %s", uri)
+    r: httpx.Response = await client.get(uri)
+
+    return _response_content(uri=uri, response=r)
+
+
+async def download_many(uris: Iterable[str], *, max_connections: int = 64) -> list[bytes]:
+    """Download several uris concurrently over one shared connection pool.
 
-    log_cache_usage(request=r)
+    Useful for fetching every child sitemap of a sitemap index: the requests overlap instead of
+    waiting on each other, and requests to the same host reuse connections (multiplexed over HTTP/2
+    when the server supports it).
 
-    r.raise_for_status()
+    Args:
+        uris(Iterable[str]): The uris to download. Expected format: HTTP/HTTPS URL.
+        max_connections(int): The maximum number of open connections.
+
+    Returns:
+        list[bytes]: The data from each uri, in the same order as `uris`
+    """
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    async with httpx.AsyncClient(timeout=10, http2=True, follow_redirects=True, limits=limits) as client:
+        return list(await asyncio.gather(*(download_uri_data_async(uri, client=client) for uri in uris)))
+
+
+async def _gather_downloads(downloads: Iterable[Coroutine[Any, Any, bytes]]) -> list[bytes]:
+    """Run downloads concurrently, cancelling the ones still running as soon as one of them fails.
+
+    `asyncio.gather` on its own leaves the other downloads running after the first failure, so they would
+    still be using the client while the caller closes it.
+
+    Args:
+        downloads(Iterable[Coroutine[Any, Any, bytes]]): The downloads to run
+
+    Returns:
+        list[bytes]: The result of each download, in the same order as `downloads`
+    """
+    tasks: list[asyncio.Task[bytes]] = [asyncio.ensure_future(download) for download in downloads]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+# First two bytes of every gzip file.
+_GZIP_MAGIC = b"\x1f\x8b"
+
+# The sitemap protocol limits an uncompressed sitemap to 50 MB.
+_MAX_SITEMAP_SIZE = 50 * 1024 * 1024
+
+
+def _response_content(uri: str, response: httpx.Response) -> bytes:
+    """Check the response for errors and return its content.
+
+    Args:
+        uri(str): The uri that was downloaded.
+        response(httpx.Response): The response from the download.
+
+    Returns:
+        bytes: The content of the response, decompressed if it is a gzip file
+
+    Raises:
+        httpx.DecodingError: If a gzip file is corrupt, truncated or larger than 50 MB uncompressed
+    """
+    log_cache_usage(request=response)
+
+    response.raise_for_status()
     logger.debug("Downloaded data from %s", uri)
 
     max_log_length = 100
-    truncated_content: bytes = r.content[:max_log_length] + b"..." if len(r.content) > max_log_length else r.content
+    content: bytes = response.content
+    if content[:2] == _GZIP_MAGIC:
+        # A gzipped sitemap file (.xml.gz), as opposed to a gzip Content-Encoding that httpx already decoded
+        logger.debug("Decompressing gzipped data from %s", uri)
+        content = _gunzip(uri=uri, response=response)
+    truncated_content: bytes = content[:max_log_length] + b"..." if len(content) > max_log_length else content
     logger.debug("Downloaded data: %s", truncated_content)
 
-    return r.content
+    return content
+
+
+def _gunzip(uri: str, response: httpx.Response) -> bytes:
+    """Decompress a gzipped sitemap file, refusing to inflate it past the 50 MB sitemap size limit.
+
+    Args:
+        uri(str): The uri that was downloaded.
+        response(httpx.Response): The response whose content is a gzip file.
+
+    Returns:
+        bytes: The decompressed content
+
+    Raises:
+        httpx.DecodingError: If the gzip file is corrupt, truncated or larger than 50 MB uncompressed
+    """
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)  # gzip header and trailer
+    try:
+        content: bytes = decompressor.decompress(response.content, _MAX_SITEMAP_SIZE)
+    except zlib.error as e:
+        msg = f"Could not decompress gzipped data from {uri}: {e}"
+        raise httpx.DecodingError(msg, request=response.request) from e
+
+    if not decompressor.eof:
+        if len(content) >= _MAX_SITEMAP_SIZE:
+            msg = f"Gzipped data from {uri} is larger than {_MAX_SITEMAP_SIZE} bytes uncompressed"
+        else:
+            msg = f"Gzipped data from {uri} is truncated"
+        raise httpx.DecodingError(msg, request=response.request)
+
+    return content
 
 
 def log_cache_usage(request: httpx.Response) -> None:
@@ -146,6 +400,20 @@ def log_cache_usage(request: httpx.Response) -> None:
         logger.info("%s was retrieved from cache", request.url)
 
 
+def _local_name(element: Element) -> str:
+    """Get the tag name of an element without its namespace.
+
+    Splitting the Clark-notation tag string is several times faster than building an etree.QName.
+
+    Args:
+        element(Element): The element
+
+    Returns:
+        str: The local name, e.g. "loc" for "{http://www.sitemaps.org/schemas/sitemap/0.9}loc"
+    """
+    return element.tag.rpartition("}")[2]
+
+
 def bytes_to_element(data: bytes) -> Element:
     """Convert the data to an lxml element.
 
@@ -158,11 +426,8 @@ def bytes_to_element(data: bytes) -> Element:
     Returns:
         Element: The lxml element as an Element from lxml.etree
     """
-    content = BytesIO(data)
     try:
-        downloaded_xml = etree.parse(content)
-        logger.debug("Parsed XML: %s", downloaded_xml)
-        root: Element | Any = downloaded_xml.getroot()
+        root: Element = etree.fromstring(data, parser=_XML_PARSER)
 
     except etree.XMLSyntaxError:
         logger.exception("Error parsing XML")
@@ -172,9 +437,86 @@ def bytes_to_element(data: bytes) -> Element:
     return root
 
 
+def file_to_element(path: str | Path) -> Element:
+    """Parse an XML file on disk into an lxml element.
+
+    libxml2 reads the file itself, so the file content is never copied into a Python bytes object.
+
+    Args:
+        path(str | Path): The path of the XML file
+
+    Returns:
+        Element: The root element of the file
+
+    Raises:
+        etree.XMLSyntaxError: Syntax error while parsing an XML document
+    """
+    try:
+        root: Element = etree.parse(str(path), parser=_XML_PARSER).getroot()
+
+    except etree.XMLSyntaxError:
+        logger.exception("Error parsing XML from %s", path)
+        raise
+
+    logger.debug("Parsed XML root element: %s", root)
+    return root
+
+
+def iter_bytes_elements(data: bytes, tag: str | tuple[str, ...]) -> Generator[Element, Any, None]:
+    """Stream-parse the data and yield each matching child of the root once it has been fully parsed.
+
+    Only direct children of the root are yielded, so an extension element that happens to share the tag,
+    e.g. an <x:url> inside a <url>, is left in place as part of its parent.
+    Unlike `bytes_to_element`, the full tree is never kept in memory. When the caller asks for the next
+    element, the previous one is cleared and its already processed siblings are removed from the tree,
+    so an element must be consumed before the generator is advanced.
+
+    Args:
+        data(bytes): The data to parse
+        tag(str | tuple[str, ...]): The tag or tags to yield, e.g. "{*}url". Namespace wildcards are supported.
+
+    Yields:
+        Element: Each matching child of the root, in document order
+
+    Raises:
+        etree.XMLSyntaxError: Syntax error while parsing an XML document
+    """
+    try:
+        for _event, element in etree.iterparse(
+            BytesIO(data),
+            events=("end",),
+            tag=tag,
+            remove_blank_text=True,
+            remove_comments=True,
+            resolve_entities=False,
+            no_network=True,
+        ):
+            parent: Element | None = element.getparent()
+            if parent is not None and parent.getparent() is None:
+                yield element
+                _release(element)
+
+    except etree.XMLSyntaxError:
+        logger.exception("Error parsing XML")
+        raise
+
+
+def _release(element: Element) -> None:
+    """Free an element that has been consumed during stream-parsing, along with its processed siblings.
+
+    Args:
+        element(Element): The element that was just consumed
+    """
+    element.clear()
+    while element.getprevious() is not None:
+        del element.getparent()[0]  # type: ignore[union-attr]
+
+
 class Sitemap(BaseData):
     """Representation of the <sitemap> element."""
 
+    __slots__ = ()
+
     fields: tuple[Literal["loc"], Literal["lastmod"]] = "loc", "lastmod"
 
     def __init__(self, loc: str, lastmod: str | None = None) -> None:
@@ -222,8 +564,14 @@ class Url(BaseData):
         ValueError: If `priority` is not between 0.0 and 1.0.
     """
 
+    __slots__ = ("_changefreq", "_priority")
+
     fields: Fields = ("loc", "lastmod", "changefreq", "priority")
     valid_freqs: ValidFreqs = ("always", "hourly", "daily", "weekly", "monthly", "yearly", "never")
+    # Same values as valid_freqs, for constant-time membership checks. valid_freqs keeps the order for messages.
+    _valid_freqs_set: typing.ClassVar[frozenset[str]] = frozenset(valid_freqs)
+    _MIN_PRIORITY: typing.ClassVar[float] = 0.0
+    _MAX_PRIORITY: typing.ClassVar[float] = 1.0
 
     def __init__(
         self: Url,
@@ -243,7 +591,7 @@ class Url(BaseData):
         self.loc = loc
         self.lastmod = lastmod
         self.changefreq = changefreq
-        self.priority = float(priority) if priority is not None else None
+        self.priority = priority
 
     @property
     def changefreq(self: Url) -> Freqs | None:
@@ -261,9 +609,12 @@ class Url(BaseData):
         Raises:
             ValueError: Value is not an allowed value
         """
-        if frequency is not None and frequency not in Url.valid_freqs:
-            msg: str = f"'{frequency}' is not an allowed value: {Url.valid_freqs}"
-            raise ValueError(msg)
+        if frequency is not None:
+            if frequency not in Url._valid_freqs_set:
+                msg: str = f"'{frequency}' is not an allowed value: {Url.valid_freqs}"
+                raise ValueError(msg)
+            # Only seven values are allowed, so share one string object per value between all Url instances
+            frequency = sys.intern(frequency)
         self._changefreq: Freqs | None = frequency
 
     @property
@@ -276,11 +627,11 @@ class Url(BaseData):
         return self._priority
 
     @priority.setter
-    def priority(self: Url, priority: float | None) -> None:
+    def priority(self: Url, priority: str | float | None) -> None:
         if priority is not None:
-            min_value = 0.0
-            max_value = 1.0
-            if priority < min_value or priority > max_value:
+            if type(priority) is not float:
+                priority = float(priority)
+            if not Url._MIN_PRIORITY <= priority <= Url._MAX_PRIORITY:
                 msg: str = f"'{priority}' is not between 0.0 and 1.0"
                 raise ValueError(msg)
 
@@ -303,6 +654,47 @@ class Url(BaseData):
         return f"Url(loc={self.loc}, lastmod={self.lastmod}, changefreq={self.changefreq}, priority={self.priority})"
 
 
+class _UrlSetTarget:
+    """lxml parser target that builds Url instances straight from parser events.
+
+    No element tree is built; only the text of the allowed <url> children is collected.
+    """
+
+    # Nesting depth of <url> and of its field elements; the <urlset> root is depth 1.
+    _URL_DEPTH: typing.ClassVar[int] = 2
+    _FIELD_DEPTH: typing.ClassVar[int] = 3
+
+    def __init__(self) -> None:
+        self.urls: list[Url] = []
+        self._depth: int = 0
+        self._url_data: dict[str, str | None] = {}
+        self._field: str | None = None
+        self._text: list[str] = []
+
+    def start(self, tag: str, _attrib: dict[str, str]) -> None:
+        self._depth += 1
+        if self._depth == self._FIELD_DEPTH:
+            name: str = tag.rpartition("}")[2]
+            self._field = name if name in UrlSet.allowed_fields else None
+            self._text = []
+
+    def data(self, data: str) -> None:
+        if self._field is not None:
+            self._text.append(data)
+
+    def end(self, _tag: str) -> None:
+        if self._depth == self._FIELD_DEPTH and self._field is not None:
+            self._url_data[self._field] = "".join(self._text) or None
+            self._field = None
+        elif self._depth == self._URL_DEPTH:
+            self.urls.append(Url(**self._url_data))  # type: ignore[arg-type]
+            self._url_data = {}
+        self._depth -= 1
+
+    def close(self) -> list[Url]:
+        return self.urls
+
+
 class UrlSet:
     """Class to represent a <urlset> element."""
 
@@ -316,6 +708,7 @@ class UrlSet:
     def __init__(self, urlset_element: Element) -> None:
         """Initialize the UrlSet instance with the <urlset> element."""
         self.urlset_element: Element = urlset_element
+        self._urls: tuple[Url, ...] | None = None
 
     @staticmethod
     def url_from_url_element(url_element: Element) -> Url:
@@ -327,14 +720,16 @@ class UrlSet:
         Returns:
             Url instance
         """
-        logger.debug(f"urls_from_url_element {url_element}")
+        logger.debug("urls_from_url_element %s", url_element)
         url_data: dict[str, str | None] = {}
         for ele in url_element:
-            name = ele.xpath("local-name()")  # type: ignore[attr-defined]
+            if not isinstance(ele.tag, str):  # processing instruction or comment
+                continue
+            name: str = _local_name(ele)
             if name in UrlSet.allowed_fields:
                 url_data[name] = ele.text
 
-        logger.debug(f"url_data {url_data}")
+        logger.debug("url_data %s", url_data)
         return Url(**url_data)
 
     @staticmethod
@@ -349,16 +744,53 @@ class UrlSet:
         """
         logger.debug(f"urls_from_url_set_element {url_set_element}")
 
-        for url_element in url_set_element:
+        for url_element in url_set_element.iterchildren(tag=etree.Element):
             yield UrlSet.url_from_url_element(url_element)
 
+    @staticmethod
+    def urls_from_bytes(data: bytes) -> list[Url]:
+        """Parse a <urlset> document straight into Url instances.
+
+        Faster than `bytes_to_element` followed by `urls_from_url_set_element` because no element
+        tree is built. The root element is not checked, so only pass data known to be a <urlset>.
+
+        Args:
+            data(bytes): The <urlset> document
+
+        Returns:
+            list[Url]: The Url instances, in document order
+
+        Raises:
+            etree.XMLSyntaxError: Syntax error while parsing an XML document
+        """
+        parser = etree.XMLParser(target=_UrlSetTarget(), resolve_entities=False, no_network=True)
+        try:
+            return etree.fromstring(data, parser=parser)
+        except etree.XMLSyntaxError:
+            logger.exception("Error parsing XML")
+            raise
+
     def __iter__(self) -> Iterator[Url]:
-        """Generator for Url instances from a <urlset> element.
+        """Iterate over the Url instances from the <urlset> element.
+
+        The Url instances are built on the first iteration and reused by later ones.
 
         Returns:
             Url instance
         """
-        return UrlSet.urls_from_url_set_element(self.urlset_element)
+        if self._urls is None:
+            self._urls = tuple(UrlSet.urls_from_url_set_element(self.urlset_element))
+        return iter(self._urls)
+
+    def __len__(self) -> int:
+        """Count the <url> elements without building Url instances for them.
+
+        Returns:
+            int: The number of Url instances iteration yields
+        """
+        if self._urls is not None:
+            return len(self._urls)
+        return sum(1 for _ in self.urlset_element.iterchildren(tag=etree.Element))
 
 
 class SitemapIndex:
@@ -367,6 +799,7 @@ class SitemapIndex:
     def __init__(self, index_element: Element) -> None:
         """Initialize the SitemapIndex instance with the <sitemapindex> element."""
         self.index_element: Element = index_element
+        self._sitemaps: tuple[Sitemap, ...] | None = None
 
     @staticmethod
     def sitemap_from_sitemap_element(sitemap_element: Element) -> Sitemap:
@@ -374,19 +807,19 @@ class SitemapIndex:
 
         Args:
             sitemap_element: lxml representation of a <sitemap> element
-            sitemap_element: xml.etree.ElementTree.Element representation of a <sitemap> element
 
         Returns:
             Sitemap instance
         """
         sitemap_data: dict[str, str] = {}
         for ele in sitemap_element:
-            name = ele.xpath("local-name()")  # type: ignore[attr-defined]
+            if not isinstance(ele.tag, str):  # processing instruction or comment
+                continue
+            name: str = _local_name(ele)
             value: str = ele.text if ele.text is not None else ""  # use the text attribute directly
             sitemap_data[name] = value
 
-        msg = "Returning sitemap object with data: {}"
-        logger.debug(msg, sitemap_data)
+        logger.debug("Returning sitemap object with data: %s", sitemap_data)
         return Sitemap(**sitemap_data)
 
     @staticmethod
@@ -408,7 +841,9 @@ class SitemapIndex:
             yield SitemapIndex.sitemap_from_sitemap_element(sm_element)
 
     def __iter__(self) -> Iterator[Sitemap]:
-        """Generator for Sitemap instances from a <sitemapindex> element.
+        """Iterate over the Sitemap instances from the <sitemapindex> element.
+
+        The Sitemap instances are built on the first iteration and reused by later ones.
 
         Args:
             self: The SitemapIndex instance
@@ -416,7 +851,19 @@ class SitemapIndex:
         Returns:
             Sitemap instance
         """
-        return SitemapIndex.sitemaps_from_sitemap_index_element(self.index_element)
+        if self._sitemaps is None:
+            self._sitemaps = tuple(SitemapIndex.sitemaps_from_sitemap_index_element(self.index_element))
+        return iter(self._sitemaps)
+
+    def __len__(self) -> int:
+        """Count the <sitemap> elements without building Sitemap instances for them.
+
+        Returns:
+            int: The number of Sitemap instances iteration yields
+        """
+        if self._sitemaps is not None:
+            return len(self._sitemaps)
+        return sum(1 for _ in self.index_element.iterchildren(tag=etree.Element))
 
     def __str__(self) -> str:  # noqa: D105
         return f"<SitemapIndex: {self.index_element}>"
@@ -432,6 +879,7 @@ class SiteMapParser:
         is_data_string: bool = False,
         should_cache: bool = True,
         cache_dir: Path = Path(".cache"),
+        hishel_client: hishel.CacheClient | None = None,
     ) -> None:
         """Initialize the SiteMapParser instance with the URI.
 
@@ -443,26 +891,36 @@ class SiteMapParser:
             is_data_string: Whether the source is a raw XML string or not.
             should_cache: Whether to cache the request with Hishel (https://hishel.com/) or not.
             cache_dir: The directory to store the cached data.
+            hishel_client: A Hishel client to download with instead of creating a new one. Share one client
+                between parsers to reuse its storage and connections. It is left open.
+                Ignored if should_cache is False.
         """
         self.source: str = source
         self.is_sitemap_index: bool = False
+        self._root_element: Element | None = None
         self._sitemaps: SitemapIndex | None = None
         self._url_set: UrlSet | None = None
         self._should_cache: bool = should_cache
         self._cache_dir: Path = cache_dir
+        self._hishel_client: hishel.CacheClient | None = hishel_client
         self._is_data_string: bool = is_data_string
         self._initialize()
 
     @staticmethod
-    def get_hishel_controller() -> hishel.Controller:
+    def get_hishel_controller(*, allow_heuristics: bool = False) -> hishel.Controller:
         """Get the Hishel default controller.
 
+        Args:
+            allow_heuristics: Also cache responses without explicit freshness headers, for as long as
+                their Last-Modified header suggests (RFC 9111 heuristic freshness).
+
         Returns:
             The Hishel controller
         """
         return hishel.Controller(
             cacheable_methods=["GET", "HEAD"],
             cacheable_status_codes=[200, 203, 204, 206, 300, 301, 308, 404, 405, 410, 414, 501],
+            allow_heuristics=allow_heuristics,
         )
 
     def get_hishel_storage(self) -> hishel.FileStorage:
@@ -490,21 +948,16 @@ class SiteMapParser:
         # Determine if we're using raw XML data or downloading from a URL
         if self._is_data_string:
             data: bytes = self.source.encode("utf-8")
+        elif self._should_cache and self._hishel_client is not None:
+            data: bytes = download_uri_data(uri=self.source, hishel_client=self._hishel_client)
+        elif self._should_cache:
+            with self.get_hishel_client() as hishel_client:
+                data: bytes = download_uri_data(uri=self.source, hishel_client=hishel_client)
         else:
-            data: bytes = download_uri_data(
-                uri=self.source,
-                hishel_client=self.get_hishel_client(),
-                should_cache=self._should_cache,
-            )
-
-        root_element: Element = bytes_to_element(data=data)
-
-        self.is_sitemap_index = self._is_sitemap_index_element(root_element)
+            data: bytes = download_uri_data(uri=self.source, should_cache=False)
 
-        if self.is_sitemap_index:
-            self._sitemaps = SitemapIndex(index_element=root_element)
-        else:
-            self._url_set = UrlSet(urlset_element=root_element)
+        self._root_element = bytes_to_element(data=data)
+        self.is_sitemap_index = self._is_sitemap_index_element(self._root_element)
 
     @staticmethod
     def _is_sitemap_index_element(element: Element) -> bool:
@@ -516,10 +969,25 @@ class SiteMapParser:
         Returns:
             bool: True if the element is a sitemapindex, False otherwise
         """
-        namespaces: dict[str, str] = {"ns": element.tag.split("}")[0].strip("{")}
-        logger.debug(f"{namespaces['ns']=}")
+        return SiteMapParser._tag_is_sitemap_index(element.tag)
+
+    @staticmethod
+    def _tag_is_sitemap_index(tag: str) -> bool:
+        """Determine if a tag is a namespaced <sitemapindex> tag.
 
-        return bool(len(element.xpath("/ns:sitemapindex", namespaces=namespaces)))  # type: ignore[attr-defined]
+        The standard sitemap namespace is checked with a plain string comparison. Other namespaces
+        are still accepted as long as the local name matches.
+
+        Args:
+            tag(str): The tag in Clark notation, e.g. "{http://www.sitemaps.org/schemas/sitemap/0.9}sitemapindex"
+
+        Returns:
+            bool: True if the tag is a <sitemapindex>, False otherwise
+        """
+        if tag == _SITEMAPINDEX_TAG:
+            return True
+        qname = etree.QName(tag)
+        return qname.namespace is not None and qname.localname == "sitemapindex"
 
     @staticmethod
     def _is_url_set_element(element: Element) -> bool:
@@ -531,10 +999,24 @@ class SiteMapParser:
         Returns:
             bool: True if the element is a <urlset>, False otherwise
         """
-        namespaces: dict[str, str] = {"ns": element.tag.split("}")[0].strip("{")}
-        logger.debug(f"{namespaces['ns']=}")
+        return SiteMapParser._tag_is_url_set(element.tag)
+
+    @staticmethod
+    def _tag_is_url_set(tag: str) -> bool:
+        """Determine if a tag is a namespaced <urlset> tag.
 
-        return bool(len(element.xpath("/ns:urlset", namespaces=namespaces)))  # type: ignore[attr-defined]
+        Same as `_tag_is_sitemap_index`, the standard namespace is checked first.
+
+        Args:
+            tag(str): The tag in Clark notation, e.g. "{http://www.sitemaps.org/schemas/sitemap/0.9}urlset"
+
+        Returns:
+            bool: True if the tag is a <urlset>, False otherwise
+        """
+        if tag == _URLSET_TAG:
+            return True
+        qname = etree.QName(tag)
+        return qname.namespace is not None and qname.localname == "urlset"
 
     def get_sitemaps(self) -> SitemapIndex:
         """Retrieve the sitemaps.
@@ -542,6 +1024,8 @@ class SiteMapParser:
         Can check if 'has_sitemaps()' returns True to determine
         if this should be used without calling it
 
+        The SitemapIndex is created on the first call and returned again by later calls.
+
         Raises:
             KeyError: If the root is not a <sitemapindex>
 
@@ -554,14 +1038,18 @@ class SiteMapParser:
             raise KeyError(error_msg)
 
         if self._sitemaps is None:
-            msg = "Sitemaps are not available"
-            raise KeyError(msg)
+            if self._root_element is None:
+                msg = "Sitemaps are not available"
+                raise KeyError(msg)
+            self._sitemaps = SitemapIndex(index_element=self._root_element)
 
         return self._sitemaps
 
     def get_urls(self) -> UrlSet:
         """Retrieve the urls.
 
+        The UrlSet is created on the first call and returned again by later calls.
+
         Raises:
             KeyError: If the root is not a <urlset>
 
@@ -578,11 +1066,92 @@ class SiteMapParser:
             raise KeyError(error_msg)
 
         if self._url_set is None:
-            msg = "URLs are not available"
-            raise KeyError(msg)
+            if self._root_element is None:
+                msg = "URLs are not available"
+                raise KeyError(msg)
+            self._url_set = UrlSet(urlset_element=self._root_element)
 
         return self._url_set
 
+    async def get_all_urls_async(self, *, max_concurrency: int = 32) -> list[Url]:
+        """Retrieve the urls of every sitemap reachable from the source.
+
+        If the source is a <sitemapindex>, its child sitemaps are downloaded concurrently over one shared
+        connection pool. Each level of nested sitemap indexes is parsed once all of its sitemaps have been
+        downloaded, and the next level is followed from there. If a download fails, the downloads still
+        running are cancelled before the error is raised.
+        Each sitemap is downloaded at most once, so indexes that list themselves or each other do not loop.
+        Child downloads are not cached.
+
+        Args:
+            max_concurrency(int): The maximum number of child sitemaps downloaded at the same time.
+
+        Returns:
+            list[Url]: The urls of every <urlset> found, in document order
+        """
+        if not self.has_sitemaps():
+            return list(self.get_urls())
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+
+        async def download(uri: str) -> bytes:
+            async with semaphore:
+                return await download_uri_data_async(uri, client=client)
+
+        seen: set[str] = {self.source}
+        pending: list[str] = []
+
+        def enqueue(sitemaps: Iterable[Sitemap]) -> None:
+            for sitemap in sitemaps:
+                if sitemap.loc is not None and sitemap.loc not in seen:
+                    seen.add(sitemap.loc)
+                    pending.append(sitemap.loc)
+
+        urls: list[Url] = []
+        enqueue(self.get_sitemaps())
+        async with httpx.AsyncClient(timeout=10, http2=True, follow_redirects=True, limits=limits) as client:
+            while pending:
+                payloads: list[bytes] = await _gather_downloads(download(uri) for uri in pending)
+                pending.clear()
+                for payload in payloads:
+                    root_element: Element = bytes_to_element(data=payload)
+                    if self._is_sitemap_index_element(root_element):
+                        enqueue(SitemapIndex(index_element=root_element))
+                    else:
+                        urls.extend(UrlSet(urlset_element=root_element))
+
+        return urls
+
+    @staticmethod
+    def iter_urls(data: bytes) -> Generator[Url, Any, None]:
+        """Stream the Url instances out of a <urlset> document without building its whole tree.
+
+        Memory use stays flat regardless of the size of the sitemap, and the first Url is available
+        before the rest of the document has been parsed.
+
+        Args:
+            data(bytes): The <urlset> document
+
+        Yields:
+            Url: Each <url> of the document, in document order
+        """
+        for url_element in iter_bytes_elements(data, "{*}url"):
+            yield UrlSet.url_from_url_element(url_element)
+
+    @staticmethod
+    def iter_sitemaps(data: bytes) -> Generator[Sitemap, Any, None]:
+        """Stream the Sitemap instances out of a <sitemapindex> document without building its whole tree.
+
+        Args:
+            data(bytes): The <sitemapindex> document
+
+        Yields:
+            Sitemap: Each <sitemap> of the document, in document order
+        """
+        for sitemap_element in iter_bytes_elements(data, "{*}sitemap"):
+            yield SitemapIndex.sitemap_from_sitemap_element(sitemap_element)
+
     def has_sitemaps(self) -> bool:
         """Determine if the URL's data contained sitemaps.
 
@@ -608,7 +1177,7 @@ class SiteMapParser:
         Returns:
             str
         """
-        return str(self._sitemaps if self.has_sitemaps() else self._url_set)
+        return str(self.get_sitemaps() if self.has_sitemaps() else self.get_urls())
 
 
 class JSONExporter:
@@ -619,24 +1188,19 @@ class JSONExporter:
         self.data: SiteMapParser = data
 
     @staticmethod
-    def _collate(fields: SitemapFields | UrlFields, row_data: SitemapIndex | UrlSet) -> list[dict[str, Any]]:
-        """Collate data from SitemapIndex or UrlSet into a list of dictionaries.
+    def _dumps(fields: SitemapFields | UrlFields, row_data: SitemapIndex | UrlSet) -> str:
+        """Serialize Sitemap or Url objects to compact JSON.
+
+        orjson serializes the lastmod datetimes natively, so the rows are passed as-is.
 
         Args:
             fields (SitemapFields | UrlFields): The fields to include in the output.
             row_data (SitemapIndex | UrlSet): An iterable containing Sitemap or Url objects.
 
         Returns:
-            list: A list of dictionaries where each dictionary represents a Sitemap or Url object.
+            str: JSON data as a string
         """
-        dump_data: list[dict[str, Any]] = []
-        for sm in row_data:
-            row: dict[str, Any] = {}
-            for fld in fields:
-                v = getattr(sm, fld)
-                row[fld] = v.isoformat() if isinstance(v, datetime) else v
-            dump_data.append(row)
-        return dump_data
+        return orjson.dumps([{fld: getattr(sm, fld) for fld in fields} for sm in row_data]).decode()
 
     def export_sitemaps(self) -> str:
         """Export site map data to JSON format.
@@ -644,12 +1208,7 @@ class JSONExporter:
         Returns:
             str: JSON data as a string
         """
-        try:
-            sitemap_fields: SitemapFields = getattr(Sitemap, "fields", ("loc", "lastmod"))  # Default fields
-        except AttributeError:
-            sitemap_fields: SitemapFields = ("loc", "lastmod")  # Default fields
-
-        return dumps(self._collate(sitemap_fields, self.data.get_sitemaps()))
+        return self._dumps(Sitemap.fields, self.data.get_sitemaps())
 
     def export_urls(self) -> str:
         """Export site map data to JSON format.
@@ -657,9 +1216,4 @@ class JSONExporter:
         Returns:
             str: JSON data as a string
         """
-        try:
-            url_fields: UrlFields = getattr(Url, "fields", ("loc", "lastmod", "changefreq", "priority"))
-        except AttributeError:
-            url_fields: UrlFields = ("loc", "lastmod", "changefreq", "priority")  # Default fields
-
-        return dumps(self._collate(url_fields, self.data.get_urls()))
+        return self._dumps(Url.fields, self.data.get_urls())
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+from sitemap_parser import file_to_element
+
+TESTS_DIR: Path = Path(__file__).parent
+
+# Parsed root elements of the XML fixture files, keyed by name.
+xml_roots_key = pytest.StashKey[dict[str, etree._Element]]()
+
+_XML_FIXTURES: dict[str, Path] = {
+    "sitemap_index": TESTS_DIR / "sitemap_index_data.xml",
+    "urlset": TESTS_DIR / "urlset_a.xml",
+    "urlset_custom": TESTS_DIR / "urlset_a_custom_element.xml",
+}
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    """Parse the XML fixture files once per test process and stash the root elements on the config.
+
+    Args:
+        config: The pytest config object.
+    """
+    config.stash[xml_roots_key] = {name: file_to_element(path) for name, path in _XML_FIXTURES.items()}
+
+
+@pytest.fixture(scope="session")
+def sitemap_index_root(pytestconfig: pytest.Config) -> etree._Element:
+    """Root <sitemapindex> element of tests/sitemap_index_data.xml.
+
+    Returns:
+        etree._Element: The parsed root element, shared by every test. Do not modify it.
+    """
+    return pytestconfig.stash[xml_roots_key]["sitemap_index"]
+
+
+@pytest.fixture(scope="session")
+def urlset_root(pytestconfig: pytest.Config) -> etree._Element:
+    """Root <urlset> element of tests/urlset_a.xml.
+
+    Returns:
+        etree._Element: The parsed root element, shared by every test. Do not modify it.
+    """
+    return pytestconfig.stash[xml_roots_key]["urlset"]
+
+
+@pytest.fixture(scope="session")
+def urlset_custom_root(pytestconfig: pytest.Config) -> etree._Element:
+    """Root <urlset> element of tests/urlset_a_custom_element.xml, whose <url> has a non-sitemap child element.
+
+    Returns:
+        etree._Element: The parsed root element, shared by every test. Do not modify it.
+    """
+    return pytestconfig.stash[xml_roots_key]["urlset_custom"]
+
+
+@pytest.fixture(scope="session")
+def sitemap_index_bytes() -> bytes:
+    """Raw content of tests/sitemap_index_data.xml.
+
+    Returns:
+        bytes: The file content, read once per test session.
+    """
+    return _XML_FIXTURES["sitemap_index"].read_bytes()
+
+
+@pytest.fixture(scope="session")
+def urlset_bytes() -> bytes:
+    """Raw content of tests/urlset_a.xml.
+
+    Returns:
+        bytes: The file content, read once per test session.
+    """
+    return _XML_FIXTURES["urlset"].read_bytes()
+
+
+@pytest.fixture(scope="session")
+def url_element_1(urlset_root: etree._Element) -> etree._Element:
+    """First <url> element of tests/urlset_a.xml.
+
+    Returns:
+        etree._Element: The <url> element, shared by every test. Do not modify it.
+    """
+    return urlset_root[0]
+
+
+@pytest.fixture(scope="session")
+def url_element_3(urlset_custom_root: etree._Element) -> etree._Element:
+    """The <url> element of tests/urlset_a_custom_element.xml.
+
+    Returns:
+        etree._Element: The <url> element, shared by every test. Do not modify it.
+    """
+    return urlset_custom_root[0]
+
+
+@pytest.fixture(scope="session")
+def amount_of_sitemaps(sitemap_index_root: etree._Element) -> int:
+    """Number of <sitemap> elements in tests/sitemap_index_data.xml.
+
+    Returns:
+        int: The expected sitemap count, computed once per test session.
+    """
+    return len(sitemap_index_root)
+
+
+@pytest.fixture(scope="session")
+def amount_of_urls(urlset_root: etree._Element) -> int:
+    """Number of <url> elements in tests/urlset_a.xml.
+
+    Returns:
+        int: The expected URL count, computed once per test session.
+    """
+    return len(urlset_root)
+
+
+@pytest.fixture(scope="session", params=[10, 1_000, 50_000], ids=lambda size: f"{size}-urls")
+def synthetic_urlset(request: pytest.FixtureRequest) -> tuple[bytes, int]:
+    """Generated <urlset> document with 10, 1 000 and 50 000 (the sitemap protocol limit) <url> elements.
+
+    Returns:
+        tuple[bytes, int]: The document and the number of <url> elements in it, built once per size.
+    """
+    size: int = request.param
+    urls: str = "".join(
+        f"<url><loc>http://www.example.com/page/{i}</loc><lastmod>2024-01-01</lastmod>"
+        "<changefreq>daily</changefreq><priority>0.5</priority></url>"
+        for i in range(size)
+    )
+    return f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'.encode(), size
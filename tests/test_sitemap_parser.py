@@ -1,19 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import gzip
+import logging
 import re
 import typing
-from datetime import datetime, timezone
-from io import BytesIO
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
 from json import dumps
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Literal
-from unittest.mock import MagicMock
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
 
 import hishel
+import httpx
 import pytest
 from lxml import etree
-from pytest_httpx import HTTPXMock
 
+import sitemap_parser
 from sitemap_parser import (
     BaseData,
     JSONExporter,
@@ -23,15 +27,27 @@ from sitemap_parser import (
     Url,
     UrlSet,
     bytes_to_element,
+    download_many,
     download_uri_data,
+    download_uri_data_async,
+    file_to_element,
+    iter_bytes_elements,
+    parse_iso8601,
 )
 
 if TYPE_CHECKING:
     from collections.abc import Generator, Iterator
-    from xml.etree.ElementTree import Element
 
+    from lxml.etree import _Element as Element
     from pytest_httpx import HTTPXMock
 
+# Root element queries, compiled once instead of on every root_element.xpath() call.
+_SITEMAP_NAMESPACES: dict[str, str] = {"sm": "http://www.sitemaps.org/schemas/sitemap/0.9"}
+xpath_sitemap_index = etree.XPath("/sm:sitemapindex", namespaces=_SITEMAP_NAMESPACES)
+xpath_url_set = etree.XPath("/sm:urlset", namespaces=_SITEMAP_NAMESPACES)
+
+# lastmod of the sample data below; a date without a time or offset parses to a naive datetime.
+_SAMPLE_LASTMOD = datetime(2024, 1, 1)  # noqa: DTZ001
 
 # Sample data for testing
 valid_sitemap_xml = """
@@ -93,9 +109,9 @@ def test_parse_valid_sitemap() -> None:
     assert len(urls) == 2
     assert urls[0].loc == "https://example.com/"
     assert urls[0].lastmod is not None
-    assert urls[0].lastmod.isoformat() == "2024-01-01T00:00:00"
+    assert urls[0].lastmod == _SAMPLE_LASTMOD
     assert urls[0].changefreq == "daily"
-    assert urls[0].priority == 0.8
+    assert urls[0].priority == pytest.approx(0.8)
 
 
 def test_parse_valid_sitemap_index() -> None:
@@ -106,7 +122,7 @@ def test_parse_valid_sitemap_index() -> None:
     assert len(sitemaps) == 2
     assert sitemaps[0].loc == "https://example.com/sitemap1.xml"
     assert sitemaps[0].lastmod is not None
-    assert sitemaps[0].lastmod.isoformat() == "2024-01-01T00:00:00"
+    assert sitemaps[0].lastmod == _SAMPLE_LASTMOD
 
 
 def test_invalid_url() -> None:
@@ -135,7 +151,7 @@ def test_sitemap_object() -> None:
     sitemap = Sitemap(loc="https://example.com/sitemap1.xml", lastmod="2024-01-01")
     assert sitemap.loc == "https://example.com/sitemap1.xml"
     assert sitemap.lastmod is not None
-    assert sitemap.lastmod.isoformat() == "2024-01-01T00:00:00"
+    assert sitemap.lastmod == _SAMPLE_LASTMOD
 
 
 def test_url_object() -> None:
@@ -143,9 +159,9 @@ def test_url_object() -> None:
     url = Url(loc="https://example.com/", lastmod="2024-01-01", changefreq="daily", priority=0.8)
     assert url.loc == "https://example.com/"
     assert url.lastmod is not None
-    assert url.lastmod.isoformat() == "2024-01-01T00:00:00"
+    assert url.lastmod == _SAMPLE_LASTMOD
     assert url.changefreq == "daily"
-    assert url.priority == 0.8
+    assert url.priority == pytest.approx(0.8)
 
 
 def test_bytes_to_element() -> None:
@@ -174,6 +190,26 @@ def test_lastmod_value_incorrect() -> None:
         s1.lastmod = "2019-13-01T01:33:35+00:00"
 
 
+def test_parse_iso8601() -> None:
+    """Test parse_iso8601 with common sitemap formats and a dateutil-only fallback."""
+    assert parse_iso8601("2024-01-01") == datetime(2024, 1, 1)  # noqa: DTZ001
+    assert parse_iso8601("2004-10-01T18:23:17+00:00") == datetime(2004, 10, 1, 18, 23, 17, tzinfo=timezone.utc)
+    assert parse_iso8601("2004-10-01T18:23:17Z") == datetime(2004, 10, 1, 18, 23, 17, tzinfo=timezone.utc)
+    assert parse_iso8601("2004-10-01T18:23:17Z").tzinfo is timezone.utc
+    assert parse_iso8601("2004-10-01T18:23:17z").tzinfo is timezone.utc
+    # Hour 24 is rejected by datetime.fromisoformat and handled by dateutil
+    assert parse_iso8601("2024-01-01T24:00:00") == datetime(2024, 1, 2)  # noqa: DTZ001
+    with pytest.raises(ValueError, match=r"month must be in 1..12"):
+        parse_iso8601("2019-13-01")
+
+
+@pytest.mark.parametrize("value", ["2024-01-01Z", "2024-01-01z"])
+def test_parse_iso8601_date_with_utc_designator(value: str) -> None:
+    """Test that a date without a time is not turned into a naive datetime by dropping its Z suffix."""
+    with pytest.raises(ValueError, match="ISO time too short"):
+        parse_iso8601(value)
+
+
 def test_loc_value_correct() -> None:
     """Test loc value."""
     s1 = BaseData()
@@ -192,207 +228,537 @@ def test_loc_value_incorrect() -> None:
         s.loc = "www.example.com"
 
 
-def test_download_uri_data_sitemap_index(httpx_mock: HTTPXMock) -> None:
+def test_download_uri_data_sitemap_index(httpx_mock: HTTPXMock, sitemap_index_bytes: bytes) -> None:
     """Test download_uri_data() with a sitemap index."""
-    smi_data: bytes = Path.open(Path("tests/sitemap_index_data.xml"), "rb").read()
     httpx_mock.add_response(
         url="http://www.example.com/sitemapindex.xml",
-        content=smi_data,
+        content=sitemap_index_bytes,
     )
     downloaded_data: bytes = download_uri_data(
         uri="http://www.example.com/sitemapindex.xml",
         should_cache=False,
     )
-    assert downloaded_data == smi_data
+    assert downloaded_data == sitemap_index_bytes
+
+
+def test_download_uri_data_reuses_client(httpx_mock: HTTPXMock, urlset_bytes: bytes) -> None:
+    """Test that uncached downloads share one client and leave it open for the next request."""
+    httpx_mock.add_response(url="http://www.example.com/urlset_a.xml", content=urlset_bytes, is_reusable=True)
+
+    for _ in range(2):
+        assert download_uri_data(uri="http://www.example.com/urlset_a.xml", should_cache=False) == urlset_bytes
+    assert sitemap_parser._http_client.cache_info().currsize == 1
+    assert not sitemap_parser._http_client().is_closed
+
+
+def test_download_uri_data_leaves_hishel_client_open(httpx_mock: HTTPXMock, urlset_bytes: bytes) -> None:
+    """Test that download_uri_data() does not close a client passed in by the caller."""
+    httpx_mock.add_response(url="http://www.example.com/urlset_a.xml", content=urlset_bytes)
+
+    with hishel.CacheClient(storage=hishel.InMemoryStorage()) as client:
+        download_uri_data(uri="http://www.example.com/urlset_a.xml", hishel_client=client)
+        assert not client.is_closed
+
+
+def test_download_uri_data_default_cache_client(
+    httpx_mock: HTTPXMock,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    urlset_bytes: bytes,
+) -> None:
+    """Test that cached downloads without a client share one default cache client."""
+    monkeypatch.chdir(tmp_path)
+    sitemap_parser._default_cache_client.cache_clear()
+    httpx_mock.add_response(url="http://www.example.com/urlset_a.xml", content=urlset_bytes, is_reusable=True)
+
+    try:
+        for _ in range(2):
+            assert download_uri_data(uri="http://www.example.com/urlset_a.xml") == urlset_bytes
+        assert sitemap_parser._default_cache_client.cache_info().misses == 1
+        assert not sitemap_parser._default_cache_client().is_closed
+    finally:
+        sitemap_parser._default_cache_client().close()
+        sitemap_parser._default_cache_client.cache_clear()
+
+
+def test_download_uri_data_default_cache_client_heuristics(
+    httpx_mock: HTTPXMock,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    urlset_bytes: bytes,
+) -> None:
+    """Test that the default cache client reuses a response that only has a Last-Modified header."""
+    monkeypatch.chdir(tmp_path)
+    sitemap_parser._default_cache_client.cache_clear()
+    httpx_mock.add_response(
+        url="http://www.example.com/urlset_a.xml",
+        content=urlset_bytes,
+        headers={
+            "Date": format_datetime(datetime.now(tz=timezone.utc), usegmt=True),
+            "Last-Modified": "Sat, 01 Jan 2005 00:00:00 GMT",
+        },
+    )
+
+    try:
+        for _ in range(2):
+            assert download_uri_data(uri="http://www.example.com/urlset_a.xml") == urlset_bytes
+        assert len(httpx_mock.get_requests()) == 1
+    finally:
+        sitemap_parser._default_cache_client().close()
+        sitemap_parser._default_cache_client.cache_clear()
+
+
+def test_download_uri_data_if_modified_since(httpx_mock: HTTPXMock) -> None:
+    """Test that last_known_lastmod is sent as If-Modified-Since and a 304 returns None."""
+    httpx_mock.add_response(
+        url="http://www.example.com/urlset_a.xml",
+        match_headers={"If-Modified-Since": "Sat, 01 Jan 2005 00:00:00 GMT"},
+        status_code=304,
+    )
+    downloaded_data: bytes | None = download_uri_data(
+        uri="http://www.example.com/urlset_a.xml",
+        should_cache=False,
+        last_known_lastmod=datetime(2005, 1, 1, 1, 0, 0, tzinfo=timezone(timedelta(hours=1))),
+    )
+    assert downloaded_data is None
+
 
+def test_download_uri_data_unexpected_not_modified(httpx_mock: HTTPXMock) -> None:
+    """Test that a 304 to a request without If-Modified-Since raises instead of passing for an empty document."""
+    httpx_mock.add_response(url="http://www.example.com/urlset_a.xml", status_code=304)
+    with pytest.raises(httpx.HTTPStatusError, match="304 Not Modified"):
+        download_uri_data(uri="http://www.example.com/urlset_a.xml", should_cache=False)
 
-def test_download_uri_data_sitemap_index_cache(httpx_mock: HTTPXMock) -> None:
+
+def test_download_uri_data_sitemap_index_cache(httpx_mock: HTTPXMock, sitemap_index_bytes: bytes) -> None:
     """Test download_uri_data() with a sitemap index with caching."""
-    smi_data: bytes = Path.open(Path("tests/sitemap_index_data.xml"), "rb").read()
     httpx_mock.add_response(
         url="http://www.example.com/sitemapindex.xml",
-        content=smi_data,
+        content=sitemap_index_bytes,
     )
-    downloaded_data: bytes = download_uri_data(
-        uri="http://www.example.com/sitemapindex.xml",
-        hishel_client=hishel.CacheClient(),
-        should_cache=True,
-    )
-    assert downloaded_data == smi_data
+    with hishel.CacheClient(storage=hishel.InMemoryStorage()) as client:
+        downloaded_data: bytes = download_uri_data(
+            uri="http://www.example.com/sitemapindex.xml",
+            hishel_client=client,
+            should_cache=True,
+        )
+    assert downloaded_data == sitemap_index_bytes
 
 
-def test_download_uri_data_urlset(httpx_mock: HTTPXMock) -> None:
+def test_download_uri_data_urlset(httpx_mock: HTTPXMock, urlset_bytes: bytes) -> None:
     """Test download_uri_data() with a urlset."""
-    us_data = Path.open(Path("tests/urlset_a.xml"), "rb").read()
     httpx_mock.add_response(
         url="http://www.example.com/urlset_a.xml",
-        content=us_data,
+        content=urlset_bytes,
     )
     downloaded_data: bytes = download_uri_data(
         uri="http://www.example.com/urlset_a.xml",
         should_cache=False,
     )
-    assert downloaded_data == us_data
+    assert downloaded_data == urlset_bytes
 
 
-def test_download_uri_data_urlset_cache(httpx_mock: HTTPXMock) -> None:
+def test_download_uri_data_gzip_file(httpx_mock: HTTPXMock, urlset_bytes: bytes) -> None:
+    """Test download_uri_data() decompresses a gzipped sitemap file."""
+    httpx_mock.add_response(
+        url="http://www.example.com/urlset_a.xml.gz",
+        content=gzip.compress(urlset_bytes),
+        headers={"Content-Type": "application/gzip"},
+    )
+    downloaded_data: bytes = download_uri_data(
+        uri="http://www.example.com/urlset_a.xml.gz",
+        should_cache=False,
+    )
+    assert downloaded_data == urlset_bytes
+
+
+@pytest.mark.parametrize(
+    ("content", "message"),
+    [
+        (b"\x1f\x8bnot gzip", "Could not decompress"),
+        (gzip.compress(b"<urlset/>")[:-4], "is truncated"),
+        (gzip.compress(b"<urlset/>" * 2), "is larger than 10 bytes"),
+    ],
+    ids=["corrupt", "truncated", "too-large"],
+)
+def test_download_uri_data_bad_gzip_file(
+    httpx_mock: HTTPXMock,
+    monkeypatch: pytest.MonkeyPatch,
+    content: bytes,
+    message: str,
+) -> None:
+    """Test download_uri_data() raises httpx.DecodingError for a gzip file it cannot safely decompress."""
+    monkeypatch.setattr(sitemap_parser, "_MAX_SITEMAP_SIZE", 10)
+    httpx_mock.add_response(url="http://www.example.com/urlset_a.xml.gz", content=content)
+    with pytest.raises(httpx.DecodingError, match=message):
+        download_uri_data(uri="http://www.example.com/urlset_a.xml.gz", should_cache=False)
+
+
+def test_download_uri_data_urlset_cache(httpx_mock: HTTPXMock, urlset_bytes: bytes) -> None:
     """Test download_uri_data() with a urlset."""
-    us_data = Path.open(Path("tests/urlset_a.xml"), "rb").read()
     httpx_mock.add_response(
         url="http://www.example.com/urlset_a.xml",
-        content=us_data,
+        content=urlset_bytes,
     )
-    downloaded_data: bytes = download_uri_data(
-        uri="http://www.example.com/urlset_a.xml",
-        hishel_client=hishel.CacheClient(),
-        should_cache=True,
+    with hishel.CacheClient(storage=hishel.InMemoryStorage()) as client:
+        downloaded_data: bytes = download_uri_data(
+            uri="http://www.example.com/urlset_a.xml",
+            hishel_client=client,
+            should_cache=True,
+        )
+    assert downloaded_data == urlset_bytes
+
+
+def test_download_uri_data_async(httpx_mock: HTTPXMock, urlset_bytes: bytes) -> None:
+    """Test download_uri_data_async() with a shared AsyncClient."""
+    httpx_mock.add_response(url="http://www.example.com/urlset_a.xml", content=urlset_bytes)
+
+    async def download() -> bytes:
+        async with httpx.AsyncClient() as client:
+            return await download_uri_data_async("http://www.example.com/urlset_a.xml", client=client)
+
+    assert asyncio.run(download()) == urlset_bytes
+
+
+def test_download_many(httpx_mock: HTTPXMock, sitemap_index_bytes: bytes, urlset_bytes: bytes) -> None:
+    """Test download_many() returns the data in the order of the uris."""
+    httpx_mock.add_response(url="http://www.example.com/sitemapindex.xml", content=sitemap_index_bytes)
+    httpx_mock.add_response(url="http://www.example.com/urlset_a.xml", content=urlset_bytes)
+
+    downloaded_data: list[bytes] = asyncio.run(
+        download_many(["http://www.example.com/urlset_a.xml", "http://www.example.com/sitemapindex.xml"]),
     )
-    assert downloaded_data == us_data
+    assert downloaded_data == [urlset_bytes, sitemap_index_bytes]
 
 
-def test_data_to_element_sitemap_index() -> None:
+def test_download_many_http_error(httpx_mock: HTTPXMock) -> None:
+    """Test download_many() raises when one of the downloads fails."""
+    httpx_mock.add_response(url="http://www.example.com/missing.xml", status_code=404)
+
+    with pytest.raises(httpx.HTTPStatusError, match="404 Not Found"):
+        asyncio.run(download_many(["http://www.example.com/missing.xml"]))
+
+
+def test_data_to_element_sitemap_index(sitemap_index_bytes: bytes) -> None:
     """Test data_to_element() with a sitemap index."""
-    smi_data: bytes = Path.open(Path("tests/sitemap_index_data.xml"), "rb").read()
-    root_element: Element = bytes_to_element(smi_data)
-    assert len(root_element.xpath("/*[local-name()='sitemapindex']")) == 1  # type: ignore  # noqa: PGH003
-    assert len(root_element.xpath("/*[local-name()='urlset']")) == 0  # type: ignore  # noqa: PGH003
+    root_element: Element = bytes_to_element(sitemap_index_bytes)
+    assert xpath_sitemap_index(root_element) == [root_element]
+    assert xpath_url_set(root_element) == []
 
 
 def test_data_to_element_sitemap_index_broken() -> None:
     """Test data_to_element() with a broken sitemap index."""
-    smi_data: bytes = Path.open(
-        Path("tests/sitemap_index_data_broken.xml"),
-        "rb",
-    ).read()
-    with pytest.raises(SyntaxError):
+    smi_data: bytes = (Path(__file__).parent / "sitemap_index_data_broken.xml").read_bytes()
+    with pytest.raises(SyntaxError, match="Opening and ending tag mismatch"):
         bytes_to_element(smi_data)
-    # assert len(root_element.xpath("/*[local-name()='sitemapindex']")) == 1
-    # assert len(root_element.xpath("/*[local-name()='urlset']")) == 0
 
 
-def test_data_to_element_urlset() -> None:
+def test_data_to_element_urlset(urlset_bytes: bytes) -> None:
     """Test data_to_element() with a urlset."""
-    us_data: bytes = Path.open(Path("tests/urlset_a.xml"), "rb").read()
-    root_element: Element = bytes_to_element(us_data)
-    assert len(root_element.xpath("/*[local-name()='sitemapindex']")) == 0  # type: ignore  # noqa: PGH003
-    assert len(root_element.xpath("/*[local-name()='urlset']")) == 1  # type: ignore  # noqa: PGH003
+    root_element: Element = bytes_to_element(urlset_bytes)
+    assert xpath_sitemap_index(root_element) == []
+    assert xpath_url_set(root_element) == [root_element]
+
+
+def test_file_to_element(urlset_bytes: bytes) -> None:
+    """Test file_to_element() parses a file the same way bytes_to_element() parses its content."""
+    root_element: Element = file_to_element(Path(__file__).parent / "urlset_a.xml")
+    assert etree.tostring(root_element) == etree.tostring(bytes_to_element(urlset_bytes))
+
+
+def test_iter_bytes_elements_urlset(urlset_bytes: bytes) -> None:
+    """Test iter_bytes_elements() yields every <url> of a urlset."""
+    locs: list[str | None] = [
+        UrlSet.url_from_url_element(typing.cast("Element", element)).loc
+        for element in iter_bytes_elements(urlset_bytes, "{*}url")
+    ]
+    assert locs == [
+        "http://www.example.com/page/a/1",
+        "http://www.example.com/page/a/2",
+        "http://www.example.com/page/a/3",
+    ]
+
+
+def test_iter_bytes_elements_clears_processed_elements(sitemap_index_bytes: bytes) -> None:
+    """Test iter_bytes_elements() drops elements that have already been yielded."""
+    seen: list[etree._Element] = list(iter_bytes_elements(sitemap_index_bytes, "{*}sitemap"))
+    assert len(seen) == 2
+    assert all(len(element) == 0 for element in seen)
+    root: etree._Element | None = seen[-1].getparent()
+    assert root is not None
+    assert len(root) == 1
+
+
+def test_iter_bytes_elements_skips_nested_matches() -> None:
+    """Test iter_bytes_elements() only yields children of the root, leaving same-named descendants in place."""
+    data: bytes = (
+        b'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" xmlns:x="urn:x">'
+        b"<sitemap><loc>http://a.com/sitemap.xml</loc><x:sitemap>y</x:sitemap></sitemap>"
+        b"</sitemapindex>"
+    )
+    children: list[list[str]] = [
+        [child.tag for child in element] for element in iter_bytes_elements(data, "{*}sitemap")
+    ]
+    assert children == [["{http://www.sitemaps.org/schemas/sitemap/0.9}loc", "{urn:x}sitemap"]]
+
+
+@pytest.mark.parametrize(
+    "parse",
+    [
+        lambda data: list(UrlSet(bytes_to_element(data))),
+        UrlSet.urls_from_bytes,
+        lambda data: list(SiteMapParser.iter_urls(data)),
+    ],
+    ids=["tree", "target", "stream"],
+)
+def test_external_entities_are_not_resolved(tmp_path: Path, parse: typing.Callable[[bytes], list[Url]]) -> None:
+    """Test that every parsing path leaves external entities unresolved."""
+    secret: Path = tmp_path / "secret.txt"
+    secret.write_text("secret", encoding="utf-8")
+    data: bytes = (
+        f'<?xml version="1.0"?><!DOCTYPE urlset [<!ENTITY e SYSTEM "{secret.as_uri()}">]>'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"><url><loc>http://a.com/&e;</loc></url></urlset>'
+    ).encode()
+    assert [url.loc for url in parse(data)] == ["http://a.com/"]
+
+
+def test_iter_bytes_elements_broken() -> None:
+    """Test iter_bytes_elements() with a broken sitemap index."""
+    smi_data: bytes = (Path(__file__).parent / "sitemap_index_data_broken.xml").read_bytes()
+    with pytest.raises(SyntaxError, match="Opening and ending tag mismatch"):
+        list(iter_bytes_elements(smi_data, "{*}sitemap"))
 
 
 class TestSiteMapper:
     """Test the SiteMapper class."""
 
-    def setup_method(self: TestSiteMapper) -> None:
-        """Setup for TestSiteMapper.
-
-        Args:
-            self: TestSiteMapper
-        """
-        sitemap_index_data: bytes = Path.open(Path("tests/sitemap_index_data.xml"), "rb").read()
-        utf8_parser = etree.XMLParser(encoding="utf-8")
-        self.sitemap_index_xml_root = etree.parse(BytesIO(sitemap_index_data), parser=utf8_parser).getroot()
-        self.sitemap_index_element_xml = self.sitemap_index_xml_root[0]
-
-        url_set_data_bytes: bytes = Path.open(Path("tests/urlset_a.xml"), "rb").read()
-        utf8_parser = etree.XMLParser(encoding="utf-8")
-        self.url_set_data_xml = etree.parse(BytesIO(url_set_data_bytes), parser=utf8_parser)
-        self.url_set_element = self.url_set_data_xml.getroot()
-        self.url_element_1 = self.url_set_data_xml.getroot()[0]
-
-    def test_is_sitemap_index_element(self: TestSiteMapper) -> None:
+    def test_is_sitemap_index_element(
+        self,
+        sitemap_index_root: etree._Element,
+        urlset_root: etree._Element,
+    ) -> None:
         """Test is_sitemap_index_element.
 
         Args:
-            self: TestSiteMapper
+            sitemap_index_root: Parsed root of tests/sitemap_index_data.xml
+            urlset_root: Parsed root of tests/urlset_a.xml
         """
         sitemap_index_result: bool = SiteMapParser._is_sitemap_index_element(  # pyright: ignore[reportPrivateUsage]
-            typing.cast("Element", self.sitemap_index_xml_root),
+            typing.cast("Element", sitemap_index_root),
         )
-        url_set_result: bool = SiteMapParser._is_sitemap_index_element(typing.cast("Element", self.url_set_element))  # pyright: ignore[reportPrivateUsage]
+        url_set_result: bool = SiteMapParser._is_sitemap_index_element(typing.cast("Element", urlset_root))  # pyright: ignore[reportPrivateUsage]
         assert sitemap_index_result
         assert not url_set_result
 
-    def test_is_url_set_element(self: TestSiteMapper) -> None:
+    def test_is_url_set_element(
+        self,
+        sitemap_index_root: etree._Element,
+        urlset_root: etree._Element,
+    ) -> None:
         """Test is_url_set_element.
 
         Args:
-            self: TestSiteMapper
+            sitemap_index_root: Parsed root of tests/sitemap_index_data.xml
+            urlset_root: Parsed root of tests/urlset_a.xml
         """
-        url_set_result: bool = SiteMapParser._is_url_set_element(typing.cast("Element", self.url_set_element))  # pyright: ignore[reportPrivateUsage]
+        url_set_result: bool = SiteMapParser._is_url_set_element(typing.cast("Element", urlset_root))  # pyright: ignore[reportPrivateUsage]
         sitemap_index_result: bool = SiteMapParser._is_url_set_element(  # pyright: ignore[reportPrivateUsage]
-            typing.cast("Element", self.sitemap_index_xml_root),
+            typing.cast("Element", sitemap_index_root),
         )
         assert url_set_result
         assert not sitemap_index_result
 
-    def test_get_sitemaps(self: TestSiteMapper, httpx_mock: HTTPXMock) -> None:
+    def test_tag_checks_require_namespace(self) -> None:
+        """Test that the tag checks only accept namespaced root tags, in any namespace."""
+        assert SiteMapParser._tag_is_sitemap_index("{http://www.sitemaps.org/schemas/sitemap/0.9}sitemapindex")
+        assert SiteMapParser._tag_is_url_set("{http://www.sitemaps.org/schemas/sitemap/0.9}urlset")
+        assert SiteMapParser._tag_is_url_set("{http://www.google.com/schemas/sitemap/0.84}urlset")
+        assert not SiteMapParser._tag_is_sitemap_index("{http://www.sitemaps.org/schemas/sitemap/0.9}urlset")
+        assert not SiteMapParser._tag_is_sitemap_index("sitemapindex")
+        assert not SiteMapParser._tag_is_url_set("urlset")
+
+    def test_get_sitemaps(
+        self,
+        httpx_mock: HTTPXMock,
+        sitemap_index_bytes: bytes,
+        amount_of_sitemaps: int,
+    ) -> None:
         """Test get_sitemaps."""
-        amount_of_sitemaps: int = len(self.sitemap_index_xml_root)
-        smi_data: bytes = Path.open(Path("tests/sitemap_index_data.xml"), "rb").read()
-        httpx_mock.add_response(url="http://www.sitemap-example.com", content=smi_data)
+        httpx_mock.add_response(url="http://www.sitemap-example.com", content=sitemap_index_bytes)
         sm = SiteMapParser("http://www.sitemap-example.com")
         site_maps: SitemapIndex = sm.get_sitemaps()
-        assert len(list(site_maps)) == amount_of_sitemaps
+        assert sum(1 for _ in site_maps) == amount_of_sitemaps
 
-    def test_get_sitemaps_inappropriate_call(self: TestSiteMapper, httpx_mock: HTTPXMock) -> None:
+    def test_get_sitemaps_inappropriate_call(self, httpx_mock: HTTPXMock, urlset_bytes: bytes) -> None:
         """Test get_sitemaps inappropriate call."""
-        us_data: bytes = Path.open(Path("tests/urlset_a.xml"), "rb").read()
-        httpx_mock.add_response(url="http://www.url-example.com", content=us_data)
+        httpx_mock.add_response(url="http://www.url-example.com", content=urlset_bytes)
         sm = SiteMapParser("http://www.url-example.com")
-        with pytest.raises(KeyError):
+        with pytest.raises(KeyError, match="Method called when root is not a <sitemapindex>"):
             sm.get_sitemaps()
 
-    def test_get_urls(self: TestSiteMapper, httpx_mock: HTTPXMock) -> None:
+    def test_get_urls(self, httpx_mock: HTTPXMock, urlset_bytes: bytes, amount_of_urls: int) -> None:
         """Test get_urls."""
-        amount_of_urls: int = len(self.url_set_element)
-        us_data: bytes = Path.open(Path("tests/urlset_a.xml"), "rb").read()
-        httpx_mock.add_response(url="http://www.url-example.com", content=us_data)
+        httpx_mock.add_response(url="http://www.url-example.com", content=urlset_bytes)
         sm = SiteMapParser("http://www.url-example.com")
         url_set: UrlSet = sm.get_urls()
-        assert len(list(url_set)) == amount_of_urls
+        assert sum(1 for _ in url_set) == amount_of_urls
+
+    def test_shared_hishel_client(self, httpx_mock: HTTPXMock, urlset_bytes: bytes) -> None:
+        """Test that a Hishel client passed to the parser is used and left open."""
+        httpx_mock.add_response(url="http://www.url-example.com", content=urlset_bytes)
+
+        with hishel.CacheClient(storage=hishel.InMemoryStorage()) as client:
+            sm = SiteMapParser("http://www.url-example.com", hishel_client=client)
+            assert sum(1 for _ in sm.get_urls()) == 3
+            assert not client.is_closed
+        assert len(httpx_mock.get_requests()) == 1
+
+    def test_get_urls_without_cache(self, httpx_mock: HTTPXMock, urlset_bytes: bytes) -> None:
+        """Test get_urls when caching is disabled."""
+        httpx_mock.add_response(url="http://www.url-example.com", content=urlset_bytes)
+        sm = SiteMapParser("http://www.url-example.com", should_cache=False)
+        assert [str(url) for url in sm.get_urls()] == [
+            "http://www.example.com/page/a/1",
+            "http://www.example.com/page/a/2",
+            "http://www.example.com/page/a/3",
+        ]
+
+    def test_get_all_urls_async(self, httpx_mock: HTTPXMock, sitemap_index_bytes: bytes, urlset_bytes: bytes) -> None:
+        """Test get_all_urls_async follows child and nested sitemap indexes."""
+        nested_smi_data: bytes = (
+            b'<?xml version="1.0" encoding="UTF-8"?>'
+            b'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            b"<sitemap><loc>http://www.example.com/sitemap_c.xml</loc></sitemap>"
+            b"</sitemapindex>"
+        )
+        httpx_mock.add_response(url="http://www.sitemap-example.com", content=sitemap_index_bytes)
+        httpx_mock.add_response(url="http://www.example.com/sitemap_a.xml", content=urlset_bytes)
+        httpx_mock.add_response(url="https://www.example.com/sitemap_b.xml", content=nested_smi_data)
+        httpx_mock.add_response(url="http://www.example.com/sitemap_c.xml", content=urlset_bytes)
+        sm = SiteMapParser("http://www.sitemap-example.com", should_cache=False)
+
+        urls: list[Url] = asyncio.run(sm.get_all_urls_async(max_concurrency=2))
+        assert [str(url) for url in urls] == [
+            "http://www.example.com/page/a/1",
+            "http://www.example.com/page/a/2",
+            "http://www.example.com/page/a/3",
+        ] * 2
+
+    def test_get_all_urls_async_self_reference(self, httpx_mock: HTTPXMock, urlset_bytes: bytes) -> None:
+        """Test get_all_urls_async downloads each sitemap once, even if indexes list themselves or each other."""
+        smi_data: bytes = (
+            b'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            b"<sitemap><loc>http://www.sitemap-example.com</loc></sitemap>"
+            b"<sitemap><loc>http://www.example.com/sitemap_b.xml</loc></sitemap>"
+            b"<sitemap><loc>http://www.example.com/sitemap_a.xml</loc></sitemap>"
+            b"<sitemap><loc>http://www.example.com/sitemap_a.xml</loc></sitemap>"
+            b"</sitemapindex>"
+        )
+        nested_smi_data: bytes = (
+            b'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            b"<sitemap><loc>http://www.sitemap-example.com</loc></sitemap>"
+            b"<sitemap><loc>http://www.example.com/sitemap_b.xml</loc></sitemap>"
+            b"</sitemapindex>"
+        )
+        httpx_mock.add_response(url="http://www.sitemap-example.com", content=smi_data)
+        httpx_mock.add_response(url="http://www.example.com/sitemap_b.xml", content=nested_smi_data)
+        httpx_mock.add_response(url="http://www.example.com/sitemap_a.xml", content=urlset_bytes)
+        sm = SiteMapParser("http://www.sitemap-example.com", should_cache=False)
+
+        urls: list[Url] = asyncio.run(sm.get_all_urls_async())
+        assert len(urls) == 3
+        assert len(httpx_mock.get_requests()) == 3
+
+    def test_get_all_urls_async_cancels_on_error(self, httpx_mock: HTTPXMock, sitemap_index_bytes: bytes) -> None:
+        """Test get_all_urls_async cancels the other downloads of a level when one of them fails."""
+
+        async def never_answer(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(60)
+            return httpx.Response(status_code=200, request=request)
+
+        httpx_mock.add_response(url="http://www.sitemap-example.com", content=sitemap_index_bytes)
+        httpx_mock.add_response(url="http://www.example.com/sitemap_a.xml", status_code=404)
+        httpx_mock.add_callback(never_answer, url="https://www.example.com/sitemap_b.xml")
+        sm = SiteMapParser("http://www.sitemap-example.com", should_cache=False)
+
+        async def run() -> set[asyncio.Task[Any]]:
+            with pytest.raises(httpx.HTTPStatusError, match="404 Not Found"):
+                await sm.get_all_urls_async()
+            return asyncio.all_tasks() - {asyncio.current_task()}  # type: ignore[operator]
+
+        assert asyncio.run(run()) == set()
+
+    def test_get_all_urls_async_from_urlset(self, httpx_mock: HTTPXMock, urlset_bytes: bytes) -> None:
+        """Test get_all_urls_async returns the urls directly when the source is a <urlset>."""
+        httpx_mock.add_response(url="http://www.url-example.com", content=urlset_bytes)
+        sm = SiteMapParser("http://www.url-example.com", should_cache=False)
+        assert len(asyncio.run(sm.get_all_urls_async())) == 3
+
+    def test_iter_urls(self, urlset_bytes: bytes) -> None:
+        """Test iter_urls streams the same urls as get_urls."""
+        sm = SiteMapParser(urlset_bytes.decode(), is_data_string=True)
+        assert [(u.loc, u.lastmod, u.changefreq, u.priority) for u in SiteMapParser.iter_urls(urlset_bytes)] == [
+            (u.loc, u.lastmod, u.changefreq, u.priority) for u in sm.get_urls()
+        ]
+
+    def test_iter_urls_nested_extension_element(self) -> None:
+        """Test iter_urls does not mistake an extension element named url for a <url> of the urlset."""
+        data: bytes = (
+            b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" xmlns:x="urn:x">'
+            b"<url><loc>http://a.com/</loc><x:url>y</x:url></url>"
+            b"<url><loc>http://b.com/</loc></url>"
+            b"</urlset>"
+        )
+        assert [url.loc for url in SiteMapParser.iter_urls(data)] == ["http://a.com/", "http://b.com/"]
+        assert [url.loc for url in UrlSet.urls_from_bytes(data)] == ["http://a.com/", "http://b.com/"]
+
+    def test_iter_sitemaps(self, sitemap_index_bytes: bytes) -> None:
+        """Test iter_sitemaps streams the sitemaps of a sitemap index."""
+        assert [str(sitemap) for sitemap in SiteMapParser.iter_sitemaps(sitemap_index_bytes)] == [
+            "http://www.example.com/sitemap_a.xml",
+            "https://www.example.com/sitemap_b.xml",
+        ]
 
-    def test_get_urls_inappropriate_call(self: TestSiteMapper, httpx_mock: HTTPXMock) -> None:
+    def test_get_urls_inappropriate_call(self, httpx_mock: HTTPXMock, sitemap_index_bytes: bytes) -> None:
         """Test get_urls inappropriate call."""
-        smi_data: bytes = Path.open(Path("tests/sitemap_index_data.xml"), "rb").read()
-        httpx_mock.add_response(url="http://www.sitemap-example.com", content=smi_data)
+        httpx_mock.add_response(url="http://www.sitemap-example.com", content=sitemap_index_bytes)
         smi = SiteMapParser("http://www.sitemap-example.com")
-        with pytest.raises(KeyError):
+        with pytest.raises(KeyError, match=r"Use 'get_sitemaps\(\)' instead"):
             smi.get_urls()
 
-    def test_has_sitemaps(self: TestSiteMapper, httpx_mock: HTTPXMock) -> None:
+    def test_has_sitemaps(self, httpx_mock: HTTPXMock, sitemap_index_bytes: bytes) -> None:
         """Test has_sitemaps."""
-        smi_data: bytes = Path.open(Path("tests/sitemap_index_data.xml"), "rb").read()
-        httpx_mock.add_response(url="http://www.sitemap-example.com", content=smi_data)
+        httpx_mock.add_response(url="http://www.sitemap-example.com", content=sitemap_index_bytes)
         sm = SiteMapParser("http://www.sitemap-example.com")
         assert sm.has_sitemaps() is True
         assert sm.has_urls() is False
 
-    def test_has_urls(self: TestSiteMapper, httpx_mock: HTTPXMock) -> None:
+    def test_has_urls(self, httpx_mock: HTTPXMock, urlset_bytes: bytes) -> None:
         """Test has_urls."""
-        us_data: bytes = Path.open(Path("tests/urlset_a.xml"), "rb").read()
-        httpx_mock.add_response(url="http://www.url-example.com", content=us_data)
+        httpx_mock.add_response(url="http://www.url-example.com", content=urlset_bytes)
         sm = SiteMapParser("http://www.url-example.com")
         assert sm.has_urls() is True
         assert sm.has_sitemaps() is False
 
-    def test_get_urls_multiple_iters(self: TestSiteMapper, httpx_mock: HTTPXMock) -> None:
+    def test_get_urls_multiple_iters(self, httpx_mock: HTTPXMock, urlset_bytes: bytes) -> None:
         """Test get_urls multiple iters."""
-        us_data: bytes = Path.open(Path("tests/urlset_a.xml"), "rb").read()
-        httpx_mock.add_response(url="http://www.url-example.com", content=us_data)
+        httpx_mock.add_response(url="http://www.url-example.com", content=urlset_bytes)
         sm = SiteMapParser("http://www.url-example.com")
         urls_1: Iterator[Url] = iter(sm.get_urls())
         urls_2: Iterator[Url] = iter(sm.get_urls())
+        assert sm.get_urls() is sm.get_urls()
         assert str(next(urls_1)) == "http://www.example.com/page/a/1"
         assert str(next(urls_2)) == "http://www.example.com/page/a/1"
         assert str(next(urls_1)) == "http://www.example.com/page/a/2"
         assert str(next(urls_1)) == "http://www.example.com/page/a/3"
 
-    def test_get_sitemaps_multiple_iters(self: TestSiteMapper, httpx_mock: HTTPXMock) -> None:
+    def test_get_sitemaps_multiple_iters(self, httpx_mock: HTTPXMock, sitemap_index_bytes: bytes) -> None:
         """Test get_sitemaps multiple iters."""
-        us_data: bytes = Path.open(Path("tests/sitemap_index_data.xml"), "rb").read()
-        httpx_mock.add_response(url="http://www.url-example.com", content=us_data)
+        httpx_mock.add_response(url="http://www.url-example.com", content=sitemap_index_bytes)
         sm = SiteMapParser("http://www.url-example.com")
         sm_1: Iterator[Sitemap] = iter(sm.get_sitemaps())
         sm_2: Iterator[Sitemap] = iter(sm.get_sitemaps())
+        assert sm.get_sitemaps() is sm.get_sitemaps()
 
         assert str(next(sm_1)) == "http://www.example.com/sitemap_a.xml"
         assert str(next(sm_1)) == "https://www.example.com/sitemap_b.xml"
@@ -402,123 +768,158 @@ class TestSiteMapper:
 class TestSitemapIndex:
     """Test the SitemapIndex class."""
 
-    def setup_method(self: TestSitemapIndex) -> None:
-        """Setup for TestSitemapIndex."""
-        sitemap_index_data: bytes = Path.open(
-            Path("tests/sitemap_index_data.xml"),
-            "rb",
-        ).read()
-
-        utf8_parser = etree.XMLParser(encoding="utf-8")
-        self.sitemap_index_xml_root = etree.parse(
-            BytesIO(sitemap_index_data),
-            parser=utf8_parser,
-        ).getroot()
-        self.sitemap_index_element_xml = self.sitemap_index_xml_root[0]
-
-    def test_sitemap_from_sitemap_element(self: TestSitemapIndex) -> None:
+    def test_sitemap_from_sitemap_element(self, sitemap_index_root: etree._Element) -> None:
         """Test sitemap_from_sitemap_element.
 
         Args:
-            self: TestSitemapIndex
+            sitemap_index_root: Parsed root of tests/sitemap_index_data.xml
         """
-        sm: Sitemap = SitemapIndex.sitemap_from_sitemap_element(typing.cast("Element", self.sitemap_index_element_xml))
+        sm: Sitemap = SitemapIndex.sitemap_from_sitemap_element(typing.cast("Element", sitemap_index_root[0]))
         assert isinstance(sm, Sitemap)
         assert sm.loc == "http://www.example.com/sitemap_a.xml"
         assert type(sm.lastmod) is datetime
-        assert str(sm.lastmod) == "2004-10-01 18:23:17+00:00"
+        assert sm.lastmod == datetime(2004, 10, 1, 18, 23, 17, tzinfo=timezone.utc)
+        assert sm.lastmod.utcoffset() == timedelta(0)
+
+    def test_sitemap_from_sitemap_element_with_processing_instruction(self) -> None:
+        """Test that processing instructions inside a <sitemap> are skipped."""
+        sitemap_element: Element = bytes_to_element(
+            b'<sitemap xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"><?x y?><loc>http://a.com/</loc></sitemap>',
+        )
+        assert SitemapIndex.sitemap_from_sitemap_element(sitemap_element).loc == "http://a.com/"
 
-    def test_sitemaps_from_sitemap_index_element(self: TestSitemapIndex) -> None:
+    def test_sitemaps_from_sitemap_index_element(
+        self,
+        sitemap_index_root: etree._Element,
+        amount_of_sitemaps: int,
+    ) -> None:
         """Test sitemaps_from_sitemap_index_element.
 
         Args:
-            self: TestSitemapIndex
+            sitemap_index_root: Parsed root of tests/sitemap_index_data.xml
+            amount_of_sitemaps: Number of sitemaps in tests/sitemap_index_data.xml
         """
-        amount_of_sitemaps: int = len(self.sitemap_index_xml_root)
         si: Generator[Sitemap, Any, None] = SitemapIndex.sitemaps_from_sitemap_index_element(
-            typing.cast("Element", self.sitemap_index_xml_root),
+            typing.cast("Element", sitemap_index_root),
         )
-        assert len(list(si)) == amount_of_sitemaps
+        assert sum(1 for _ in si) == amount_of_sitemaps
 
-    def test_init(self: TestSitemapIndex) -> None:
+    def test_init(self, sitemap_index_root: etree._Element, amount_of_sitemaps: int) -> None:
         """Test init.
 
         Args:
-            self: TestSitemapIndex
+            sitemap_index_root: Parsed root of tests/sitemap_index_data.xml
+            amount_of_sitemaps: Number of sitemaps in tests/sitemap_index_data.xml
         """
-        amount_of_sitemaps: int = len(self.sitemap_index_xml_root)
-        smi = SitemapIndex(typing.cast("Element", self.sitemap_index_xml_root))
-        assert len(list(smi)) == amount_of_sitemaps
+        smi = SitemapIndex(typing.cast("Element", sitemap_index_root))
+        assert sum(1 for _ in smi) == amount_of_sitemaps
+
+    def test_iter_reuses_sitemaps(self, sitemap_index_root: etree._Element) -> None:
+        """Test that iterating a SitemapIndex twice returns the same Sitemap instances."""
+        smi = SitemapIndex(typing.cast("Element", sitemap_index_root))
+        assert list(smi) == list(smi)
+        assert next(iter(smi)) is next(iter(smi))
+
+    def test_len(self, sitemap_index_root: etree._Element, amount_of_sitemaps: int) -> None:
+        """Test that len() counts the sitemaps before and after they are built."""
+        smi = SitemapIndex(typing.cast("Element", sitemap_index_root))
+        assert len(smi) == amount_of_sitemaps
+        assert len(smi) == sum(1 for _ in smi)
+
+        smi = SitemapIndex(
+            bytes_to_element(
+                b'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"><?x y?>'
+                b"<sitemap><loc>http://a.com/sitemap.xml</loc></sitemap></sitemapindex>",
+            ),
+        )
+        assert len(smi) == 1
+        assert len(list(smi)) == 1
+        assert len(smi) == 1
 
 
 class TestSitemap:
     """Test Sitemap class."""
 
-    def test_init(self: TestSitemap) -> None:
+    def test_init(self) -> None:
         """Test Sitemap.__init__."""
         s = Sitemap(loc="http://www.example.com/index.html", lastmod="2004-10-01T18:24:19+00:00")
 
         assert s.loc == "http://www.example.com/index.html"
         assert type(s.lastmod) is datetime
-        assert s.lastmod.isoformat() == "2004-10-01T18:24:19+00:00"
+        assert s.lastmod == datetime(2004, 10, 1, 18, 24, 19, tzinfo=timezone.utc)
+        assert s.lastmod.utcoffset() == timedelta(0)
 
-    def test_str(self: TestSitemap) -> None:
-        """Test Sitemap.__str__.
-
-        Args:
-            self: TestSitemap
-        """
+    def test_str(self) -> None:
+        """Test Sitemap.__str__."""
         s = Sitemap(loc="http://www.example.com/index.html", lastmod="2004-10-01T18:24:19+00:00")
         assert str(s) == "http://www.example.com/index.html"
 
+    def test_slots(self) -> None:
+        """Test that Sitemap instances use __slots__ instead of a per-instance __dict__."""
+        s = Sitemap(loc="http://www.example.com/index.html")
+        assert not hasattr(s, "__dict__")
+        with pytest.raises(AttributeError, match="'foo'"):
+            s.foo = "bar"  # type: ignore[attr-defined]
+
+
+@pytest.fixture(scope="module")
+def fully_loaded_url() -> Url:
+    """Fixture with a Url that has every field set, built once per module.
+
+    Returns:
+        Url: Url with loc, lastmod, changefreq and priority set
+    """
+    return Url(
+        loc="http://www.example2.com/index2.html",
+        lastmod="2010-11-04T17:21:18+00:00",
+        changefreq="never",
+        priority=0.3,
+    )
+
 
 class TestUrl:
     """Test Url class."""
 
-    def test_init_fully_loaded(self: TestUrl) -> None:
+    def test_init_fully_loaded(self, fully_loaded_url: Url) -> None:
         """Test init.
 
         Args:
-            self: TestUrl
+            fully_loaded_url: Url with every field set
         """
-        priority = 0.3
-
-        u = Url(
-            loc="http://www.example2.com/index2.html",
-            lastmod="2010-11-04T17:21:18+00:00",
-            changefreq="never",
-            priority=priority,
-        )
+        u: Url = fully_loaded_url
         assert u.loc == "http://www.example2.com/index2.html"
         assert type(u.lastmod) is datetime
-        assert str(u.lastmod) == "2010-11-04 17:21:18+00:00"
+        assert u.lastmod == datetime(2010, 11, 4, 17, 21, 18, tzinfo=timezone.utc)
+        assert u.lastmod.utcoffset() == timedelta(0)
         assert u.changefreq == "never"
         assert type(u.priority) is float
-        assert u.priority == priority
+        assert u.priority == pytest.approx(0.3)
 
-    def test_changefreq(self: TestUrl) -> None:
-        """Test changefreq.
+    def test_slots(self, fully_loaded_url: Url) -> None:
+        """Test that Url instances use __slots__ instead of a per-instance __dict__.
 
         Args:
-            self: TestUrl
+            fully_loaded_url: Url with every field set
+        """
+        assert not hasattr(fully_loaded_url, "__dict__")
+        assert {"_loc", "_lastmod", "_changefreq", "_priority"} <= {
+            name for cls in type(fully_loaded_url).__mro__ for name in getattr(cls, "__slots__", ())
+        }
+
+    @pytest.mark.parametrize("frequency", ["always", "hourly", "daily", "weekly", "monthly", "yearly", "never", None])
+    def test_changefreq(self, frequency: str | None) -> None:
+        """Test that every allowed changefreq, and None, can be assigned.
+
+        Args:
+            frequency: The changefreq to assign
         """
         u = Url(loc="http://www.example.com/index.html", changefreq="always")
-        assert u.changefreq == "always"
-        u.changefreq = None
-        assert u.changefreq is None
-        u.changefreq = "hourly"
-        assert u.changefreq == "hourly"
-        u.changefreq = "daily"
-        assert u.changefreq == "daily"
-        u.changefreq = "weekly"
-        assert u.changefreq == "weekly"
-        u.changefreq = "monthly"
-        assert u.changefreq == "monthly"
-        u.changefreq = "yearly"
-        assert u.changefreq == "yearly"
-        u.changefreq = "never"
-        assert u.changefreq == "never"
+        u.changefreq = frequency
+        assert u.changefreq == frequency
 
+    def test_changefreq_invalid(self) -> None:
+        """Test that assigning a changefreq that is not allowed raises."""
+        u = Url(loc="http://www.example.com/index.html", changefreq="always")
         with pytest.raises(
             ValueError,
             match=re.escape(
@@ -527,37 +928,37 @@ class TestUrl:
         ):
             u.changefreq = "foobar"
 
-    def test_priority(self: TestUrl) -> None:
-        """Test priority.
+    def test_changefreq_is_interned(self) -> None:
+        """Test that equal changefreq values share one string object."""
+        u1 = Url(loc="http://www.example.com/1", changefreq=b"daily".decode())
+        u2 = Url(loc="http://www.example.com/2", changefreq=b"daily".decode())
+        assert u1.changefreq is u2.changefreq
+
+    @pytest.mark.parametrize("priority", [0.0, 0.3, 0.6, 1.0, "0.5"])
+    def test_priority(self, priority: float | str) -> None:
+        """Test that priorities within 0.0 and 1.0 are accepted and stored as floats.
 
         Args:
-            self: TestUrl
+            priority: The priority to assign
         """
-        priority06 = 0.6
-        priority03 = 0.3
-        priority00 = 0.0
-        priority10 = 1.0
-
-        u = Url(loc="http://www.example/com/index.html", priority=priority06)
-        assert u.priority == priority06
-        u.priority = priority03
-        assert u.priority == priority03
-        u.priority = priority00
-        assert u.priority == priority00
-        u.priority = priority10
-        assert u.priority == priority10
-
-        with pytest.raises(ValueError, match=r"'1.1' is not between 0.0 and 1.0"):
-            u.priority = 1.1  # Max is 1.0
-        with pytest.raises(ValueError, match=r"'-0.1' is not between 0.0 and 1.0"):
-            u.priority = -0.1  # Min is 0.0
-
-    def test_str(self: TestUrl) -> None:
-        """Test str.
+        u = Url(loc="http://www.example/com/index.html", priority=0.6)
+        u.priority = priority  # type: ignore[assignment]
+        assert type(u.priority) is float
+        assert u.priority == pytest.approx(float(priority))
+
+    @pytest.mark.parametrize("priority", [1.1, -0.1])
+    def test_priority_out_of_range(self, priority: float) -> None:
+        """Test that priorities outside 0.0 and 1.0 are rejected.
 
         Args:
-            self: TestUrl
+            priority: The priority to assign
         """
+        u = Url(loc="http://www.example/com/index.html", priority=0.6)
+        with pytest.raises(ValueError, match=re.escape(f"'{priority}' is not between 0.0 and 1.0")):
+            u.priority = priority
+
+    def test_str(self) -> None:
+        """Test str."""
         s = Url(loc="http://www.example2.com/index2.html")
         assert str(s) == "http://www.example2.com/index2.html"
 
@@ -565,180 +966,211 @@ class TestUrl:
 class TestUrlSet:
     """Test the UrlSet class."""
 
-    def setup_method(self: TestUrlSet) -> None:
-        """Setup for TestUrlSet."""
-        url_set_data_bytes: bytes = Path.open(Path("tests/urlset_a.xml"), "rb").read()
-        utf8_parser = etree.XMLParser(encoding="utf-8")
-        self.url_set_data_xml = etree.parse(BytesIO(url_set_data_bytes), parser=utf8_parser)
-        self.url_set_element = self.url_set_data_xml.getroot()
-        self.url_element_1 = self.url_set_data_xml.getroot()[0]
-        self.url_element_2 = self.url_set_data_xml.getroot()[1]
-
-        # custom element handling
-        custom_ele_file = "tests/urlset_a_custom_element.xml"
-        url_set_custom_ele_bytes: bytes = Path.open(Path(custom_ele_file), "rb").read()
-        self.url_set_data_custom_xml = etree.parse(BytesIO(url_set_custom_ele_bytes), parser=utf8_parser)
-        self.url_set_custom_element = self.url_set_data_custom_xml.getroot()
-        self.url_element_3 = self.url_set_data_custom_xml.getroot()[0]
-
-    def test_allowed_fields(self: TestUrlSet) -> None:
+    def test_allowed_fields(self) -> None:
         """Test allowed_fields."""
         for f in UrlSet.allowed_fields:
             assert f in {"loc", "lastmod", "changefreq", "priority"}
 
-    def test_url_from_url_element(self: TestUrlSet) -> None:
+    def test_url_from_url_element(self, url_element_1: etree._Element) -> None:
         """Test url_from_url_element.
 
         Args:
-            self: TestUrlSet
+            url_element_1: First <url> element of tests/urlset_a.xml
         """
-        priority = 0.8
-        url: Url = UrlSet.url_from_url_element(typing.cast("Element", self.url_element_1))
+        url: Url = UrlSet.url_from_url_element(typing.cast("Element", url_element_1))
         assert isinstance(url, Url)
         assert url.loc == "http://www.example.com/page/a/1"
         assert type(url.lastmod) is datetime
-        assert str(url.lastmod) == "2005-01-01 00:00:00"
+        assert url.lastmod == datetime(2005, 1, 1)  # noqa: DTZ001
         assert url.changefreq == "monthly"
-        assert url.priority == priority
+        assert url.priority == pytest.approx(0.8)
 
-    def test_url_from_custom_url_element(self: TestUrlSet) -> None:
+    def test_url_from_url_element_with_processing_instruction(self) -> None:
+        """Test that processing instructions inside a <url> are skipped."""
+        url_element: Element = bytes_to_element(
+            b'<url xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"><?x y?><loc>http://a.com/</loc></url>',
+        )
+        assert UrlSet.url_from_url_element(url_element).loc == "http://a.com/"
+
+    def test_url_from_custom_url_element(self, url_element_3: etree._Element) -> None:
         """Test url_from_url_element.
 
         Args:
-            self: TestUrlSet
+            url_element_3: The <url> element of tests/urlset_a_custom_element.xml
         """
-        priority = 0.3
-        url: Url = UrlSet.url_from_url_element(typing.cast("Element", self.url_element_3))
+        url: Url = UrlSet.url_from_url_element(typing.cast("Element", url_element_3))
         assert isinstance(url, Url)
         assert url.loc == "http://www.example.com/page/a/4"
         assert type(url.lastmod) is datetime
-        assert str(url.lastmod) == "2006-05-05 00:00:00"
+        assert url.lastmod == datetime(2006, 5, 5)  # noqa: DTZ001
         assert url.changefreq == "monthly"
-        assert url.priority == priority
+        assert url.priority == pytest.approx(0.3)
 
-    def test_urls_from_url_set_element(self: TestUrlSet) -> None:
+    def test_urls_from_url_set_element(self, urlset_root: etree._Element, amount_of_urls: int) -> None:
         """Test urls_from_url_set_element.
 
         Args:
-            self: TestUrlSet
+            urlset_root: Parsed root of tests/urlset_a.xml
+            amount_of_urls: Number of URLs in tests/urlset_a.xml
         """
-        amount_of_urls: int = len(self.url_set_element)
-        urls: Generator[Url, Any, None] = UrlSet.urls_from_url_set_element(typing.cast("Element", self.url_set_element))
-        assert len(list(urls)) == amount_of_urls
+        urls: Generator[Url, Any, None] = UrlSet.urls_from_url_set_element(typing.cast("Element", urlset_root))
+        assert sum(1 for _ in urls) == amount_of_urls
+
+        first_url: Url = next(UrlSet.urls_from_url_set_element(typing.cast("Element", urlset_root)))
+        assert first_url.loc == "http://www.example.com/page/a/1"
 
-    def test_urls_from_url_set_custom_element(self: TestUrlSet) -> None:
+    def test_urls_from_url_set_custom_element(self, urlset_custom_root: etree._Element) -> None:
         """Test urls_from_url_set_element.
 
         Args:
-            self: TestUrlSet
+            urlset_custom_root: Parsed root of tests/urlset_a_custom_element.xml
         """
         urls: Generator[Url, Any, None] = UrlSet.urls_from_url_set_element(
-            typing.cast("Element", self.url_set_custom_element),
+            typing.cast("Element", urlset_custom_root),
         )
-        assert len(list(urls)) == 1
+        assert sum(1 for _ in urls) == 1
+
+        first_url: Url = next(UrlSet.urls_from_url_set_element(typing.cast("Element", urlset_custom_root)))
+        assert first_url.loc == "http://www.example.com/page/a/4"
+
+    def test_urls_streaming_count(self, urlset_bytes: bytes, amount_of_urls: int) -> None:
+        """Test that streaming the urls yields as many as the in-memory tree holds.
+
+        Args:
+            urlset_bytes: Raw content of tests/urlset_a.xml
+            amount_of_urls: Number of URLs in tests/urlset_a.xml
+        """
+        assert sum(1 for _ in SiteMapParser.iter_urls(urlset_bytes)) == amount_of_urls
+
+    def test_urls_from_synthetic_url_set(
+        self,
+        synthetic_urlset: tuple[bytes, int],
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        """Test that every parsing path yields every url of a large generated urlset.
+
+        The library logs every <url> at DEBUG, which the live log of the pytest config would print,
+        so the level is raised for this test.
 
-    def test_init(self: TestUrlSet) -> None:
+        Args:
+            synthetic_urlset: Generated urlset document and its number of urls
+            caplog: Pytest fixture to capture log output
+        """
+        caplog.set_level(logging.WARNING, logger="sitemap_parser")
+        data, size = synthetic_urlset
+        url_set = UrlSet(bytes_to_element(data))
+        assert len(url_set) == size
+        assert sum(1 for _ in url_set) == size
+        assert len(UrlSet.urls_from_bytes(data)) == size
+        assert sum(1 for _ in SiteMapParser.iter_urls(data)) == size
+
+    def test_init(self, urlset_root: etree._Element, amount_of_urls: int) -> None:
         """Test init.
 
         Args:
-            self: TestUrlSet
+            urlset_root: Parsed root of tests/urlset_a.xml
+            amount_of_urls: Number of URLs in tests/urlset_a.xml
         """
-        amount_of_urls: int = len(self.url_set_element)
-        u = UrlSet(typing.cast("Element", self.url_set_element))
-        assert len(list(u)) == amount_of_urls
+        u = UrlSet(typing.cast("Element", urlset_root))
+        assert sum(1 for _ in u) == amount_of_urls
+
+    def test_iter_reuses_urls(self, urlset_root: etree._Element) -> None:
+        """Test that iterating a UrlSet twice returns the same Url instances."""
+        u = UrlSet(typing.cast("Element", urlset_root))
+        assert list(u) == list(u)
+        assert next(iter(u)) is next(iter(u))
+
+    def test_len(self, urlset_root: etree._Element, amount_of_urls: int) -> None:
+        """Test that len() counts the urls before and after they are built."""
+        u = UrlSet(typing.cast("Element", urlset_root))
+        assert len(u) == amount_of_urls
+        assert len(u) == sum(1 for _ in u)
+
+        u = UrlSet(
+            bytes_to_element(
+                b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"><?x y?>'
+                b"<url><loc>http://a.com/</loc></url></urlset>",
+            ),
+        )
+        assert len(u) == 1
+        assert len(list(u)) == 1
+        assert len(u) == 1
+
+    def test_urls_from_bytes(self) -> None:
+        """Test that urls_from_bytes builds the same urls as the element based path."""
+        for path in (Path(__file__).parent / "urlset_a.xml", Path(__file__).parent / "urlset_a_custom_element.xml"):
+            data: bytes = path.read_bytes()
+            expected: list[Url] = list(UrlSet.urls_from_url_set_element(bytes_to_element(data)))
+            urls: list[Url] = UrlSet.urls_from_bytes(data)
+            assert [(u.loc, u.lastmod, u.changefreq, u.priority) for u in urls] == [
+                (u.loc, u.lastmod, u.changefreq, u.priority) for u in expected
+            ]
+
+    def test_urls_from_bytes_broken(self) -> None:
+        """Test that urls_from_bytes raises on malformed XML."""
+        with pytest.raises(etree.XMLSyntaxError, match="Premature end of data"):
+            UrlSet.urls_from_bytes(b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"><url>')
 
 
 # Define sample data for testing
 
 
 @pytest.fixture
-def sitemap_parser_mock() -> MagicMock:
-    """Fixture that mocks the SiteMapParser and its methods.
+def sitemap_parser_mock() -> SiteMapParser:
+    """Fixture that stands in for a SiteMapParser with fixed sitemaps and urls.
+
+    A plain namespace with the two getters is all the exporters need, and it has none of MagicMock's overhead.
 
     Returns:
-        MagicMock: Mocked SiteMapParser object
+        SiteMapParser: Stand-in SiteMapParser object
     """
-    mock = MagicMock()
-    mock.get_sitemaps.return_value = sitemap_data
-    mock.get_urls.return_value = url_data
-    return mock
+    mock = SimpleNamespace(get_sitemaps=lambda: sitemap_data, get_urls=lambda: url_data)
+    return typing.cast("SiteMapParser", mock)
 
 
-def test_json_exporter_initialization(sitemap_parser_mock: MagicMock) -> None:
+def test_json_exporter_initialization(sitemap_parser_mock: SiteMapParser) -> None:
     """Test that the JSONExporter initializes properly with site map data."""
     exporter = JSONExporter(sitemap_parser_mock)
     assert exporter.data == sitemap_parser_mock
 
 
-def test_collate_method_for_sitemaps(sitemap_parser_mock: MagicMock) -> None:
-    """Test the _collate method for Sitemap objects."""
-    exporter = JSONExporter(sitemap_parser_mock)
-    fields: tuple[Literal["loc"], Literal["lastmod"]] = ("loc", "lastmod")
-
-    expected_output: list[dict[str, str]] = [
-        {"loc": "https://example.com/sitemap1.xml", "lastmod": "2023-01-01T00:00:00+00:00"},
-        {"loc": "https://example.com/sitemap2.xml", "lastmod": "2023-01-02T00:00:00+00:00"},
-    ]
-
-    result: list[dict[str, Any]] = exporter._collate(fields, sitemap_data)  # type: ignore[arg-type]
-    assert result == expected_output
-
-
-def test_collate_method_for_urls(sitemap_parser_mock: MagicMock) -> None:
-    """Test the _collate method for Url objects."""
-    exporter = JSONExporter(sitemap_parser_mock)
-    fields = ("loc", "lastmod", "changefreq", "priority")
-
-    expected_output = [
-        {
-            "loc": "https://example.com/page1",
-            "lastmod": "2023-01-01T00:00:00+00:00",
-            "changefreq": "daily",
-            "priority": 1.0,
-        },
-        {
-            "loc": "https://example.com/page2",
-            "lastmod": "2023-01-02T00:00:00+00:00",
-            "changefreq": "weekly",
-            "priority": 0.8,
-        },
-    ]
-
-    result = exporter._collate(fields, url_data)  # type: ignore[arg-type]
-    assert result == expected_output
-
-
-def test_export_sitemaps(sitemap_parser_mock: MagicMock) -> None:
+def test_export_sitemaps(sitemap_parser_mock: SiteMapParser) -> None:
     """Test that export_sitemaps method returns valid JSON for sitemaps."""
     exporter = JSONExporter(sitemap_parser_mock)
 
-    expected_output = dumps([
-        {"loc": "https://example.com/sitemap1.xml", "lastmod": "2023-01-01T00:00:00+00:00"},
-        {"loc": "https://example.com/sitemap2.xml", "lastmod": "2023-01-02T00:00:00+00:00"},
-    ])
+    expected_output = dumps(
+        [
+            {"loc": "https://example.com/sitemap1.xml", "lastmod": "2023-01-01T00:00:00+00:00"},
+            {"loc": "https://example.com/sitemap2.xml", "lastmod": "2023-01-02T00:00:00+00:00"},
+        ],
+        separators=(",", ":"),
+    )
 
     result = exporter.export_sitemaps()
     assert result == expected_output
 
 
-def test_export_urls(sitemap_parser_mock: MagicMock) -> None:
+def test_export_urls(sitemap_parser_mock: SiteMapParser) -> None:
     """Test that export_urls method returns valid JSON for URLs."""
     exporter = JSONExporter(sitemap_parser_mock)
 
-    expected_output = dumps([
-        {
-            "loc": "https://example.com/page1",
-            "lastmod": "2023-01-01T00:00:00+00:00",
-            "changefreq": "daily",
-            "priority": 1.0,
-        },
-        {
-            "loc": "https://example.com/page2",
-            "lastmod": "2023-01-02T00:00:00+00:00",
-            "changefreq": "weekly",
-            "priority": 0.8,
-        },
-    ])
+    expected_output = dumps(
+        [
+            {
+                "loc": "https://example.com/page1",
+                "lastmod": "2023-01-01T00:00:00+00:00",
+                "changefreq": "daily",
+                "priority": 1.0,
+            },
+            {
+                "loc": "https://example.com/page2",
+                "lastmod": "2023-01-02T00:00:00+00:00",
+                "changefreq": "weekly",
+                "priority": 0.8,
+            },
+        ],
+        separators=(",", ":"),
+    )
 
     result = exporter.export_urls()
     assert result == expected_output